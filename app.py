@@ -1,26 +1,66 @@
 # Run this app with `python app.py` and
 # visit http://127.0.0.1:8050/ in your web browser.
 
+import argparse
+import io
 import itertools
 import json
 import math
 from collections import OrderedDict
 import os
+import pstats
 import dash
 import dash_bootstrap_components as dbc
+import diskcache
 import matplotlib as mpl
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import plotly.io as pio
-from dash import ALL, MATCH, Dash, Input, Output, State, dcc, html
+from dash import (
+    ALL,
+    MATCH,
+    ClientsideFunction,
+    Dash,
+    DiskcacheManager,
+    Input,
+    Output,
+    State,
+    dcc,
+    html,
+)
 from dash.dash_table import DataTable, FormatTemplate
 from dash.dash_table.Format import Format, Scheme, Symbol, Trim
 from dash_extensions.enrich import DashProxy, MultiplexerTransform
-import shutil
 
+from campaigns import Campaigns, campaign_deltas
 from columns import *
+from dataset import Dataset, catalogue_columns, index_columns, sort_frame
+from downsample import DOWNSAMPLERS
+from duckdb_dataset import DuckDBDataset, write_partitioned
+from export import (
+    EXPORT_FORMATS,
+    RenderService,
+    job_slot,
+    safe_filename,
+    zip_figures,
+)
+from figure_cache import FigureCache
+from instrumentation import (
+    CallbackMetrics,
+    CallbackMetricsTransform,
+    Profiler,
+    observe_response,
+    phase,
+    timed,
+)
 from labels import *
+from ingest import parse_fields
+from storage import CACHE_DIR, cached_directory, cached_frame, read_store
 from styles import *
+from traces import TraceStore
+from watcher import SourceWatcher, watch
 
 
 pio.kaleido.scope.mathjax = None
@@ -30,46 +70,272 @@ pio.kaleido.scope.default_format = "pdf"
 # TODO : change style
 
 
+# latency and payload of every callback, exposed on /metrics
+callback_metrics = CallbackMetrics()
+profiler = Profiler(os.path.join(".cache", "profiles"))
 app = DashProxy(
     __name__,
-    transforms=[MultiplexerTransform()],
+    transforms=[
+        MultiplexerTransform(),
+        CallbackMetricsTransform(callback_metrics, profiler),
+    ],
     external_stylesheets=[dbc.themes.BOOTSTRAP],
 )
+# wsgi entry point, e.g. `gunicorn -w 4 app:server`
+server = app.server
 
 ### plotly configs
 
 ##BLOCK constants
 
+DATA_FILE = "recap_frameworkbenchmark.csv"
+JOBS_DIR = os.path.join(".cache", "jobs")
 DURATION = 20
 PAGE_SIZE = 20
+# low cardinality text fields, stored as pandas categoricals
+CATEGORICAL_COLUMNS = [
+    "scenario",
+    "name",
+    "display_name",
+    "language",
+    "status",
+] + categories
 
 columns = columns_name + columns_performance + create_energy_columns()
 
+
+def env_flag(name):
+    """boolean environment variable, unset, empty, 0, false and no are off"""
+    return os.environ.get(name, "").strip().lower() not in {"", "0", "false", "no"}
+
+
+parser = argparse.ArgumentParser(description="greenboard dashboard")
+parser.add_argument(
+    "--data-file",
+    default=os.environ.get("GREENBOARD_DATA_FILE", DATA_FILE),
+    help="csv of the benchmark results",
+)
+parser.add_argument(
+    "--backend",
+    choices=["pandas", "duckdb"],
+    default=os.environ.get("GREENBOARD_BACKEND", "pandas"),
+    help="hold the dataset in memory (pandas) or query it from parquet files "
+    "partitioned by scenario (duckdb)",
+)
+parser.add_argument(
+    "--campaigns",
+    metavar="DIR",
+    default=os.environ.get("GREENBOARD_CAMPAIGNS"),
+    help="directory of benchmark campaigns (csv files or stores of ingest.py) "
+    "to compare with each other",
+)
+parser.add_argument(
+    "--traces",
+    metavar="DIR",
+    default=os.environ.get("GREENBOARD_TRACES"),
+    help="store of the power traces of the runs, built by traces.py",
+)
+parser.add_argument(
+    "--trace-points",
+    type=int,
+    default=int(os.environ.get("GREENBOARD_TRACE_POINTS", 2000)),
+    help="points sent per power trace, downsampled with lttb",
+)
+parser.add_argument(
+    "--rebuild-cache",
+    action="store_true",
+    default=env_flag("GREENBOARD_REBUILD_CACHE"),
+    help="parse the csv again instead of reading the cached dataset",
+)
+parser.add_argument(
+    "--shared-dataset",
+    metavar="DIR",
+    default=os.environ.get("GREENBOARD_SHARED_DATASET"),
+    help="materialize the dataset once in DIR (e.g. /dev/shm/greenboard) and "
+    "attach every worker to it without copy",
+)
+parser.add_argument(
+    "--memory-report",
+    action="store_true",
+    help="print the memory held by the dataset before and after dtype compaction",
+)
+parser.add_argument(
+    "--renderers",
+    type=int,
+    default=int(os.environ.get("GREENBOARD_RENDERERS", 4)),
+    help="number of kaleido processes rendering the exported figures",
+)
+parser.add_argument(
+    "--export-jobs",
+    type=int,
+    default=int(os.environ.get("GREENBOARD_EXPORT_JOBS", 2)),
+    help="number of exports running at the same time on the host",
+)
+parser.add_argument(
+    "--clientside-levels",
+    action="store_true",
+    default=env_flag("GREENBOARD_CLIENTSIDE_LEVELS"),
+    help="send every level of the line plots and filter them in the browser",
+)
+parser.add_argument(
+    "--webgl-threshold",
+    type=int,
+    default=int(os.environ.get("GREENBOARD_WEBGL_THRESHOLD", 1000)),
+    help="draw the line plots with WebGL above this number of points",
+)
+parser.add_argument(
+    "--max-points",
+    type=int,
+    default=int(os.environ.get("GREENBOARD_MAX_POINTS", 0)),
+    help="downsample the line plots to about this number of points (0: never)",
+)
+parser.add_argument(
+    "--downsample",
+    choices=sorted(DOWNSAMPLERS),
+    default=os.environ.get("GREENBOARD_DOWNSAMPLE", "lttb"),
+    help="how the line plots are downsampled",
+)
+parser.add_argument(
+    "--figure-cache-dir",
+    default=os.environ.get("GREENBOARD_FIGURE_CACHE_DIR"),
+    help="share the figure cache between workers through this directory",
+)
+parser.add_argument(
+    "--figure-cache-size",
+    type=int,
+    default=int(os.environ.get("GREENBOARD_FIGURE_CACHE_SIZE", 128)),
+    help="maximum number of cached selections",
+)
+parser.add_argument(
+    "--figure-cache-ttl",
+    type=int,
+    default=int(os.environ.get("GREENBOARD_FIGURE_CACHE_TTL", 600)),
+    help="seconds a cached selection stays valid",
+)
+parser.add_argument(
+    "--watch",
+    type=float,
+    metavar="SECONDS",
+    default=float(os.environ.get("GREENBOARD_WATCH", 0)),
+    help="add the rows appended to the data file every SECONDS without restarting "
+    "(0: never)",
+)
+parser.add_argument(
+    "--profiling",
+    action="store_true",
+    default=env_flag("GREENBOARD_PROFILING"),
+    help="allow /profile to capture the profile of the next callback",
+)
+# only read the command line when launched with `python app.py`
+args = parser.parse_args() if __name__ == "__main__" else parser.parse_args([])
+if args.watch and args.backend != "pandas":
+    parser.error("--watch needs the pandas backend")
+
 ##BLOCK data gathering
 def load_data(filename="recap_frameworkbenchmark.csv"):
-    data = pd.read_csv(filename)
-    data["av_power_cpu"] = data["cpu"].apply(lambda x: x / DURATION / 2)
-    data["av_power_dram"] = data["dram"].apply(lambda x: x / DURATION / 2)
+    """rows of the csv, or of the store built by ingest.py when given a directory"""
+    if os.path.isdir(filename):
+        data = read_store(filename)
+    else:
+        data = parse_fields(pd.read_csv(filename))
+    return derive_columns(data)
+
+
+def derive_columns(data):
+    data["display_name"] = data["display_name"].fillna(data["name"])
+    data["av_power_cpu"] = data["cpu"] / DURATION / 2
+    data["av_power_dram"] = data["dram"] / DURATION / 2
     data["av_cpu_per_request"] = data["cpu"] / data["totalRequests"]
     data["av_dram_per_request"] = data["dram"] / data["totalRequests"]
-    data["scenario"] = data.apply(
-        lambda row: "idle" if row["level"] == 0 else row["scenario"], axis=1
-    )
+    data["scenario"] = data["scenario"].mask(data["level"] == 0, "idle")
     data["RPS"] = data["totalRequests"] / DURATION
 
+    return data.astype(dict.fromkeys(CATEGORICAL_COLUMNS, "category"))
+
+
+def downcast(column):
+    """smallest dtype holding the values of a float column
+    integral columns without missing values become integers, counters that
+    float32 cannot represent exactly are kept as float64"""
+    values = column.to_numpy()
+    finite = values[~np.isnan(values)]
+    integral = np.array_equal(finite, np.round(finite))
+    if integral and len(finite) == len(values):
+        return pd.to_numeric(column, downcast="integer")
+    if integral and np.abs(finite).max(initial=0) > 2**24:
+        return column
+    return column.astype("float32")
+
+
+def compact(data):
+    data = data.apply(lambda col: downcast(col) if col.dtype.kind == "f" else col)
+    for col in data.select_dtypes("category"):
+        data[col] = data[col].cat.remove_unused_categories()
     return data
 
 
 def clean_data(data):
     df = data.loc[data["status"] == "sucess"]
-    return df
+    return compact(df)
+
+
+def memory_report(data):
+    """print the memory held by data against the same frame with the
+    object/float64 dtypes the ingestion used to produce"""
+    legacy = data.astype(
+        {
+            col: "object" if dtype.name == "category" else "float64"
+            for col, dtype in data.dtypes.items()
+            if dtype != object
+        }
+    )
+    before = legacy.memory_usage(deep=True).sum() / 2**20
+    after = data.memory_usage(deep=True).sum() / 2**20
+    print(f"dataset memory: {before:.2f} MiB before, {after:.2f} MiB after compaction")
+
+
+def build_dataset(filename):
+    return sort_frame(calculate_effeciency(clean_data(load_data(filename))))
+
+
+def load_dataset(filename=DATA_FILE, rebuild=False, shared_dir=None):
+    """cleaned dataset, read from the columnar cache when the csv did not change,
+    and the path of the cache
+
+    with shared_dir the cache lives there and its numeric columns are
+    attached read-only, so N workers hold a single copy of the data"""
+    return cached_frame(
+        filename,
+        build_dataset,
+        rebuild=rebuild,
+        cache_dir=shared_dir or CACHE_DIR,
+        zero_copy=shared_dir is not None,
+    )
+
+
+def open_dataset(filename, rebuild=False):
+    """dataset read by the callbacks, see --backend"""
+    # the callbacks only read the dataset through the methods of Dataset, the
+    # duckdb backend implements them over parquet files instead of a frame
+    if args.backend == "duckdb":
+        return DuckDBDataset(
+            cached_directory(
+                filename,
+                build_dataset,
+                write_partitioned,
+                rebuild=rebuild,
+                cache_dir=args.shared_dataset or CACHE_DIR,
+            )
+        )
+    data, path = load_dataset(filename, rebuild=rebuild, shared_dir=args.shared_dataset)
+    return Dataset(data, source=path)
 
 
 def calculate_effeciency(dt):
     """calculate the ratio of the
     "latencyAvg",
     "totalRequests",
-    "rps",
+    "RPS",
     "latency99"
      "dram",
     "av_power_dram",
@@ -78,60 +344,319 @@ def calculate_effeciency(dt):
     "av_power_cpu",
     "av_cpu_per_request",
     on the max  while grouped by
-    name and scenario"""
+    name and scenario
+
+    computed once at load time with a single groupby-transform,
+    stored in eff_<metric> columns"""
+    maxima = dt.groupby(["name", "scenario"], observed=True)[
+        efficiency_metrics
+    ].transform("max")
+    ratios = (dt[efficiency_metrics] / maxima).replace([np.inf, -np.inf], np.nan)
+    return dt.join(ratios.astype("float32").add_prefix("eff_"))
 
 
 ##BLOCK plotting
 
 
+def line_render_mode(data1):
+    """svg traces, WebGL ones when the browser would have too many points"""
+    return "webgl" if len(data1) > args.webgl_threshold else "svg"
+
+
+def point_budget(data1, traces):
+    """points kept per trace, the --max-points budget being shared between the
+    traces (at least 2 points each), None when data1 fits in the budget"""
+    if not args.max_points or len(data1) <= args.max_points:
+        return None
+    return max(args.max_points // len(traces), 2)
+
+
+def thin(rows, metric, budget):
+    """rows of a trace drawn in the line plot of metric"""
+    if budget is None:
+        return rows
+    return rows.iloc[DOWNSAMPLERS[args.downsample](rows["level"], rows[metric], budget)]
+
+
+def trace_styles(traces, subcategory="language"):
+    """legend entry, color and symbol of every trace, the same px.line gives with
+    color="name", symbol=subcategory, shared by the figures of every metric"""
+    colors = dict(custom_palette)
+    symbols = {}
+    styles = []
+    for _, rows in traces:
+        name, sub = rows["name"].iat[0], rows[subcategory].iat[0]
+        colors.setdefault(name, LINE_COLORS[len(colors) % len(LINE_COLORS)])
+        symbols.setdefault(sub, LINE_SYMBOLS[len(symbols) % len(LINE_SYMBOLS)])
+        styles.append(
+            dict(
+                name=rows["display_name"].iat[0],
+                legendgroup=f"{name}, {sub}",
+                line=dict(color=colors[name], dash="solid"),
+                marker=dict(symbol=symbols[sub]),
+                mode="lines+markers",
+                showlegend=True,
+                xaxis="x",
+                yaxis="y",
+            )
+        )
+    return styles
+
+
+@timed("figure")
+def line_figures(
+    data1, scenario="db", metrics=("av_power_cpu",), subcategory="language"
+):
+    """one line plot per metric, the frameworks being grouped once for all
+
+    the traces and layout are assembled from known valid properties so the
+    figures skip the validation of graph_objects, the template alone takes
+    tens of milliseconds to validate"""
+    traces = line_traces(data1, subcategory)
+    styles = trace_styles(traces, subcategory)
+    budget = point_budget(data1, traces)
+    webgl = line_render_mode(data1) == "webgl"
+    x_label = X_labels[scenario]
+    sub_label = Y_labels.get(subcategory, subcategory)
+
+    figs = []
+    for metric in metrics:
+        y_label = Y_labels.get(metric, metric)
+        data = []
+        for (_, rows), style in zip(traces, styles):
+            rows = thin(rows, metric, budget)
+            trace = dict(
+                style,
+                type="scattergl" if webgl else "scatter",
+                x=rows["level"].to_numpy(),
+                y=rows[metric].to_numpy(),
+                hovertext=rows["display_name"].astype(str).to_numpy(),
+                hovertemplate=(
+                    f"<b>%{{hovertext}}</b><br><br>Frameworks={rows['name'].iat[0]}"
+                    f"<br>{sub_label}={rows[subcategory].iat[0]}"
+                    f"<br>{x_label}=%{{x}}<br>{y_label}=%{{y}}<extra></extra>"
+                ),
+            )
+            if not webgl:
+                trace["orientation"] = "v"
+            # spread of the repeated runs when data1 comes from the summary table
+            if f"{metric}_std" in rows:
+                trace["error_y"] = dict(array=rows[f"{metric}_std"].to_numpy())
+            data.append(trace)
+        layout = dict(
+            template=LINE_TEMPLATE,
+            xaxis=dict(anchor="y", domain=[0.0, 1.0], title=dict(text=x_label)),
+            yaxis=dict(anchor="x", domain=[0.0, 1.0], title=dict(text=y_label)),
+            legend=dict(title=dict(text="Frameworks"), tracegroupgap=0),
+            margin=dict(t=60),
+        )
+        figs.append(go.Figure(data=data, layout=layout, _validate=False))
+    return figs
+
+
 def line_plot(data1, scenario="db", metric="av_power_cpu", subcategory="language"):
-    displaynames = dict(zip(data1["name"], data1["display_name"]))
+    return line_figures(data1, scenario, [metric], subcategory)[0]
 
-    labels = Y_labels | {"name": "Frameworks", "level": X_labels[scenario]}
-    fig = px.line(
-        data1,
-        x="level",
-        y=metric,
+
+@timed("figure")
+def idle_power_plot(dt, scope="cpu", colors=None):
+    """idle power of the frameworks, dt being rows of the idle baseline table"""
+    displaynames = dict(zip(dt["name"], dt["display_name"]))
+    labels = Y_labels | {"name": "Frameworks"}
+    fig = px.bar(
+        dt,
+        y="name",
+        x=f"av_power_{scope}",
+        error_x=f"av_power_{scope}_std",
         color="name",
-        symbol=subcategory,
-        hover_name="display_name",
         labels=labels,
         template="plotly_white",
+        orientation="h",
         color_discrete_map=custom_palette,
     )
-    fig.for_each_trace(lambda t: t.update(name=displaynames[t.name.split(",")[0]]))
-    fig.update_layout(legend_title_text="Frameworks")
+    fig.update_yaxes(
+        tickmode="array",
+        tickvals=(vals := dt["name"].unique().tolist()),
+        ticktext=[displaynames[x] for x in vals],
+    )
+    fig.update_layout(showlegend=False)
     return fig
 
 
-def idle_power_plot(dt, scope="cpu", colors=None):
+@timed("figure")
+def efficiency_plot(dt, scope="cpu"):
+    """frameworks ranked by their mean efficiency over the displayed levels"""
     displaynames = dict(zip(dt["name"], dt["display_name"]))
-    data1 = dt[dt["scenario"] == "idle"].groupby("name").mean().reset_index()
-    labels = Y_labels | {"name": "Frameworks"}
+    metrics = ["eff_RPS", f"eff_av_{scope}_per_request"]
+    data1 = (
+        dt.groupby("name", observed=True)[metrics]
+        .mean()
+        .sort_values("eff_RPS")
+        .reset_index()
+    )
     fig = px.bar(
         data1,
         y="name",
-        x=f"av_power_{scope}",
-        color="name",
-        labels=labels,
+        x=metrics,
+        barmode="group",
+        labels=efficiency_labels,
         template="plotly_white",
         orientation="h",
-        color_discrete_map=custom_palette,
     )
+    fig.for_each_trace(lambda t: t.update(name=efficiency_labels[t.name]))
     fig.update_yaxes(
         tickmode="array",
-        tickvals=(vals := dt["name"].unique()),
+        tickvals=(vals := data1["name"].tolist()),
         ticktext=[displaynames[x] for x in vals],
     )
-    fig.update_layout(showlegend=False)
+    fig.update_layout(legend_title_text="")
     return fig
 
 
+## partial updates
+# when the same traces stay on screen (only the scope or the levels changed)
+# the figures already displayed are patched instead of being sent again
+
+
+def line_traces(data1, subcategory="language"):
+    """(key, rows) of every trace drawn by line_plot, in drawing order"""
+    grouped = data1.groupby(["name", subcategory], observed=True, sort=False)
+    return [(f"{name},{sub}", rows) for (name, sub), rows in grouped]
+
+
+@timed("figure")
+def patch_line_plot(data1, metric="av_power_cpu", subcategory="language"):
+    """patch turning a line_plot of the same traces into line_plot(data1, metric)"""
+    patch = dash.Patch()
+    traces = line_traces(data1, subcategory)
+    budget = point_budget(data1, traces)
+    for i, (_, rows) in enumerate(traces):
+        rows = thin(rows, metric, budget)
+        patch["data"][i]["x"] = rows["level"].tolist()
+        patch["data"][i]["y"] = rows[metric].tolist()
+        patch["data"][i]["hovertext"] = rows["display_name"].astype(str).tolist()
+        if f"{metric}_std" in rows:
+            patch["data"][i]["error_y"]["array"] = rows[f"{metric}_std"].tolist()
+    patch["layout"]["yaxis"]["title"]["text"] = Y_labels.get(metric, metric)
+    return patch
+
+
+@timed("figure")
+def patch_idle_power_plot(dt, scope="cpu"):
+    """patch turning an idle_power_plot of the same frameworks to another scope"""
+    patch = dash.Patch()
+    for i, (_, row) in enumerate(dt.iterrows()):
+        patch["data"][i]["x"] = [row[f"av_power_{scope}"]]
+        patch["data"][i]["error_x"]["array"] = [row[f"av_power_{scope}_std"]]
+    patch["layout"]["xaxis"]["title"]["text"] = Y_labels[f"av_power_{scope}"]
+    return patch
+
+
+@timed("figure")
+def patch_efficiency_plot(dt, scope="cpu"):
+    """patch turning an efficiency_plot of the same rows to another scope,
+    the ranking only depends on the throughput so the bars keep their order"""
+    metric = f"eff_av_{scope}_per_request"
+    data1 = (
+        dt.groupby("name", observed=True)[["eff_RPS", metric]]
+        .mean()
+        .sort_values("eff_RPS")
+    )
+    patch = dash.Patch()
+    patch["data"][1]["x"] = data1[metric].tolist()
+    patch["data"][1]["legendgroup"] = metric
+    patch["data"][1]["offsetgroup"] = metric
+    patch["data"][1]["hovertemplate"] = (
+        f"{efficiency_labels['variable']}={metric}<br>"
+        f"{efficiency_labels['value']}=%{{x}}<br>name=%{{y}}<extra></extra>"
+    )
+    return patch
+
+
+@timed("figure")
+def power_trace_plot(runs, scope="cpu"):
+    """power of the scope over time, runs mapping a framework to its trace"""
+    data = []
+    for i, (name, trace) in enumerate(runs.items()):
+        time, power = trace["time"], trace[scope]
+        kept = DOWNSAMPLERS["lttb"](time, power, args.trace_points)
+        color = custom_palette.get(name, LINE_COLORS[i % len(LINE_COLORS)])
+        data.append(
+            dict(
+                type="scattergl",
+                mode="lines",
+                name=name,
+                x=time[kept],
+                y=power[kept],
+                line=dict(color=color),
+            )
+        )
+    layout = dict(
+        template=LINE_TEMPLATE,
+        xaxis=dict(title=dict(text="time (s)")),
+        yaxis=dict(title=dict(text=f"{scope} power (W)")),
+        legend=dict(title=dict(text="Frameworks")),
+        margin=dict(t=60),
+    )
+    return go.Figure(data=data, layout=layout, _validate=False)
+
+
 ##BLOCK initialisation
 
-df = load_data()
-df = clean_data(df)
-custom_palette = dict(zip(df["name"].unique(), px.colors.qualitative.Plotly))
+dataset = open_dataset(args.data_file, rebuild=args.rebuild_cache)
+# the frame of the pandas backend
+df = getattr(dataset, "data", None)
+if args.memory_report and df is not None:
+    memory_report(df)
+# the other campaigns are only loaded once compared
+campaigns = Campaigns(args.campaigns, open_dataset) if args.campaigns else None
+# power traces of the runs, memory mapped
+traces = TraceStore(args.traces) if args.traces else None
+# rows appended to the data file from now on are added by the hot reload
+watcher = SourceWatcher(args.data_file) if args.watch else None
+figure_cache = FigureCache(
+    maxsize=args.figure_cache_size,
+    ttl=args.figure_cache_ttl,
+    directory=args.figure_cache_dir,
+    # cached figures are only valid for the dataset they were built from
+    namespace=os.path.basename(dataset.source),
+)
+# the kaleido processes stay warm in a render process shared by the export jobs
+renderers = RenderService(args.renderers)
+# exports run as background jobs in their own processes, the diskcache is
+# shared by every worker of the host and also holds the export slots
+jobs_cache = diskcache.Cache(JOBS_DIR)
+jobs_manager = DiskcacheManager(jobs_cache)
+# the export jobs report their timings through the same cache
+callback_metrics.share(jobs_cache)
+app.server.after_request(lambda response: observe_response(callback_metrics, response))
+custom_palette = {}
+# options of the filters, the hot reload updates them in place
+languages = []
+category_options = {cat: [] for cat in categories}
+
+
+def refresh_options():
+    """filter options and palette from the catalogue of frameworks (in the
+    order of the dataset), frameworks keep their color"""
+    frameworks = dataset.catalogue_rows
+    languages[:] = [
+        {"label": lang, "value": lang} for lang in frameworks["language"].unique()
+    ]
+    for cat, options in category_options.items():
+        options[:] = frameworks[cat].unique().tolist()
+    free = [c for c in px.colors.qualitative.Plotly if c not in custom_palette.values()]
+    for name in frameworks["name"].unique():
+        if free and name not in custom_palette:
+            custom_palette[name] = free.pop(0)
+
+
+refresh_options()
+# style shared by every line plot, see line_figures
+LINE_TEMPLATE = pio.templates["plotly_white"].to_plotly_json()
+# frameworks missing from the palette and languages take the next ones
+LINE_COLORS = LINE_TEMPLATE["layout"]["colorway"]
+LINE_SYMBOLS = ["circle", "diamond", "square", "x", "cross"]
 ##BLOCK layout
 graphs_requests = dcc.Graph(
     config=plot_config,  # id={"role": "plot", "scenario": "requests", "index": 0}
@@ -148,8 +673,17 @@ graphs_av_power = dcc.Graph(
 graphs_idle_power = dcc.Graph(
     config=plot_config,  # id={"role": "plot", "scenario": "idle_power", "index": 4}
 )
+graphs_efficiency = dcc.Graph(
+    config=plot_config,  # id={"role": "plot", "scenario": "efficiency", "index": 5}
+)
+graphs_trace = dcc.Graph(config=plot_config)
+# with --clientside-levels the line figures of every level are kept here and
+# the browser only draws the selected levels, see assets/greenboard.js
+figures_requests = dcc.Store(id="figuresRequests")
+figures_latency = dcc.Store(id="figuresLatency")
+figures_energy_request = dcc.Store(id="figuresEnergyRequest")
+figures_av_power = dcc.Store(id="figuresAvPower")
 
-languages = [{"label": lang, "value": lang} for lang in df["language"].unique()]
 languagesDIV = html.Div(
     [
         # using bootstrap make this list of checkboxes fit with the rest of the page
@@ -175,7 +709,7 @@ categoriesDIV = html.Div(
                 dbc.CardHeader(cat),
                 dbc.CardBody(
                     dcc.Dropdown(
-                        options=df[cat].unique(),
+                        options=category_options[cat],
                         id={
                             "index": f"id_categorie_{cat}",
                             "scenario": "category_filter",
@@ -232,7 +766,33 @@ filtersDIV = html.Div(
 )
 infoTalbeDiv = html.Div(
     [
-        infoSecondTable := html.Div(),
+        html.Span(
+            infoTable := DataTable(
+                id="infoTable",
+                # the frameworks name is the row id, it is not displayed
+                columns=[
+                    {"id": col, "name": col}
+                    for col in catalogue_columns
+                    if col != "name"
+                ],
+                row_selectable="multi",
+                selected_rows=[],
+                # only the visible rows are rendered, whatever the catalogue size
+                virtualization=True,
+                fixed_rows={"headers": True},
+                page_action="none",
+                style_table={"height": "400px", "overflowY": "auto"},
+                style_header=style_header,
+                # virtualization needs rows of constant height
+                style_cell=style_cell
+                | {
+                    "whiteSpace": "nowrap",
+                    "overflow": "hidden",
+                    "textOverflow": "ellipsis",
+                },
+            ),
+            className="table col-12",
+        ),
         selectedRowsStore := dcc.Store("selectedRows"),
     ],
     className="row",
@@ -247,10 +807,11 @@ rawTableDIV = html.Div(
                 ## selection
                 # row_selectable="multi",
                 # selected_rows=[],
-                sort_action="native",
+                # pages are sliced and sorted on the server, see update_table_page
+                sort_action="custom",
                 sort_mode="single",
                 sort_by=[],
-                page_action="native",
+                page_action="custom",
                 page_size=PAGE_SIZE,
                 page_current=0,
                 style_table={
@@ -263,6 +824,7 @@ rawTableDIV = html.Div(
             ),
             className="table table-striped col-12",
         ),
+        rawTableView := dcc.Store(id="rawTableView"),
     ],
     className="row",
 )
@@ -276,12 +838,30 @@ downloadDiv = html.Div(
                     testsuitname := dbc.Input(
                         placeholder="testsuit", class_name="col-xs-3"
                     ),
-                    dbc.InputGroupText(".pdf"),
+                    exportFormat := dbc.Select(
+                        options=[
+                            {"label": label, "value": fmt}
+                            for fmt, label in EXPORT_FORMATS.items()
+                        ],
+                        value="pdf",
+                    ),
                 ],
                 className="",
             ),
             className="col-8 ",
         ),
+        exportStatus := html.Div(
+            [
+                exportProgress := dbc.Progress(
+                    value=0, striped=True, animated=True, class_name="col-8"
+                ),
+                cancelExportBtn := dbc.Button(
+                    "Cancel", color="secondary", size="sm", disabled=True
+                ),
+            ],
+            className="hstack gap-2 mt-1",
+            style={"display": "none"},
+        ),
         downloader := dcc.Download(),
     ]
 )
@@ -358,6 +938,23 @@ idlePlotDiv = html.Div(
     className="col-8",
 )
 
+efficiencyPlotDiv = html.Div(
+    children=[
+        html.P("Efficiency ranking", className="graph-title"),
+        graphs_efficiency,
+    ],
+    className="col-12",
+)
+
+tracePlotDiv = html.Div(
+    children=[
+        html.P("Power over the run", className="graph-title"),
+        traceLevel := dcc.Dropdown(options=[], placeholder="level", clearable=False),
+        graphs_trace,
+    ],
+    className="col-12",
+)
+
 
 graphsDIV = html.Div(
     [
@@ -375,10 +972,54 @@ graphsDIV = html.Div(
             ],
             className=" hstack",
         ),
+        efficiencyPlotDiv,
+        *([tracePlotDiv] if traces else []),
+        # what each group of figures currently displays, see ## partial updates
+        plottedPerformance := dcc.Store(id="plottedPerformance"),
+        plottedEnergy := dcc.Store(id="plottedEnergy"),
+        plottedIdle := dcc.Store(id="plottedIdle"),
+        plottedEfficiency := dcc.Store(id="plottedEfficiency"),
+        figures_requests,
+        figures_latency,
+        figures_energy_request,
+        figures_av_power,
     ],
     className="vstack",
 )
 
+compareDIV = html.Div(
+    [
+        html.H1("Compare campaigns"),
+        html.Div(
+            [
+                baseline_campaign := dcc.Dropdown(
+                    options=campaigns.names() if campaigns else [],
+                    placeholder="baseline campaign",
+                    className="col-6",
+                ),
+                compared_campaign := dcc.Dropdown(
+                    options=campaigns.names() if campaigns else [],
+                    placeholder="compared campaign",
+                    className="col-6",
+                ),
+            ],
+            className="hstack gap-2",
+        ),
+        html.Span(
+            # change of the selected frameworks per level, see compare_campaigns
+            compareTable := DataTable(
+                merge_duplicate_headers=True,
+                sort_action="native",
+                page_size=PAGE_SIZE,
+                style_header=style_header,
+                style_cell=style_cell,
+            ),
+            className="table col-12",
+        ),
+    ],
+    className="row",
+)
+
 ##BLOCK mainLayout
 app.layout = html.Div(
     [
@@ -391,11 +1032,49 @@ app.layout = html.Div(
         graphsDIV,
         # idlePlotDiv,
         rawTableDIV,
+        *([compareDIV] if campaigns else []),
     ],
     className="container vstack gap-2",
 )
 
 
+##BLOCK hot reload
+# with --watch the rows appended to the data file are added to the dataset of
+# every worker, new sessions get the new filter options
+
+
+def add_rows(rows, revision):
+    """add new runs, only the frameworks they belong to are aggregated again
+    and their cached figures are no longer read (see Dataset.revision)"""
+    global df
+    delta = clean_data(derive_columns(parse_fields(rows)))
+    if delta.empty:
+        return
+    keys = delta[["scenario", "name"]].astype(object).drop_duplicates()
+    previous = dataset.rows(keys.itertuples(index=False))
+    changed = pd.concat(
+        [previous.loc[:, ~previous.columns.str.startswith("eff_")], delta],
+        ignore_index=True,
+    )
+    # the efficiency ratios are relative to every run of the framework
+    dataset.update(calculate_effeciency(changed), revision)
+    df = dataset.data
+    refresh_options()
+
+
+def reload_source():
+    """read the data file again after it was rewritten"""
+    global df, dataset
+    dataset = open_dataset(args.data_file)
+    df = dataset.data
+    # the figures cached for the previous content are never read again
+    figure_cache.namespace = os.path.basename(dataset.source)
+    refresh_options()
+
+
+if watcher is not None:
+    watch(watcher, args.watch, add_rows, reload_source)
+
 ##BLOCK callbacks
 
 
@@ -437,41 +1116,35 @@ def update_filters_cache(selected_categories, previuous_categories):
     return previuous_categories
 
 
-def make_selectable(table):
-    """add slection behaviour to the rows
-    replace the id column with checkboxes"""
-
-    table.children[0].children[0].children.pop(0)
-    # head.children[0] = html.Th(children="", colSpan=1)
-    # head.children = [h] + head.children
-    for row in table.children[1].children:
-        id = row.children.pop(0).children
-        row.id = {"scenario": "row_selectable", "index": id}
+@app.callback(
+    Input(scenarios, "value"),
+    Input(languages_list, "value"),
+    Input(cached_categories, "data"),
+    Output({"scenario": "category_filter", "index": ALL}, "options"),
+)
+def update_facets(selected_scenario, selected_langauges, selected_categories):
+    """label every category value with the number of frameworks it would keep"""
+    with phase("data"):
+        facets = dataset.facets(
+            selected_scenario, selected_langauges, selected_categories
+        )
+    return [
+        [
+            {"label": f"{value} ({count})", "value": value}
+            for value, count in facets[cat].items()
+        ]
+        for cat in categories
+    ]
 
 
-@app.callback(
-    Input(infoSecondTable, "children"),
-    Input({"scenario": "row_selectable", "index": ALL}, "n_clicks"),
-    State({"scenario": "row_selectable", "index": ALL}, "id"),
+# the frameworks the plots show, kept in the browser
+app.clientside_callback(
+    ClientsideFunction(namespace="greenboard", function_name="selected_frameworks"),
+    Input(infoTable, "selected_row_ids"),
+    Input(infoTable, "data"),
     Output(selectedRowsStore, "data"),
-    Output({"scenario": "row_selectable", "index": ALL}, "style"),
     prevent_initial_call=True,
 )
-def select_rows(secondTable, checked, rows):
-
-    row_ids = [row["index"] for row in rows]
-    data = {
-        row_ids[i]: checked[i] is not None and checked[i] % 2 == 1
-        for i in range(len(checked))
-    }
-    styles = [
-        {"backgroundColor": "#21b6a8A7"}
-        if check is not None and check % 2 == 1
-        else None
-        for check in checked
-    ]
-
-    return data, styles
 
 
 @app.callback(
@@ -479,38 +1152,19 @@ def select_rows(secondTable, checked, rows):
     Input(scenarios, "value"),
     Input(languages_list, "value"),
     Input(cached_categories, "data"),
-    Output(infoSecondTable, "children"),
+    Output(infoTable, "data"),
+    Output(infoTable, "selected_rows"),
 )
 def select_scope(scope, selected_scenario, selected_langauges, selected_categories):
 
-    data = df.loc[df["language"].isin(selected_langauges)]
-    data = data.loc[
-        data["scenario"] == selected_scenario,
-        [
-            "name",
-            "display_name",
-            "language",
-        ]
-        + categories,
-    ]
-
-    for cat, vals in selected_categories.items():
-        if len(vals) > 0:
-            data = data.loc[data[cat].isin(vals)]
+    with phase("data"):
+        data = dataset.catalogue(
+            selected_scenario, selected_langauges, selected_categories
+        )
 
     data = data.drop_duplicates().rename(columns={"name": "id"})
-    # secondData = None
-    # data2 = data[["id", "display_name"] + categories]
-
-    secondData = dbc.Table.from_dataframe(
-        data,
-        striped=True,
-        bordered=True,
-        hover=True,
-        id="inputDataTable",
-    )
-    make_selectable(secondData)
-    return secondData
+    # a new list of frameworks starts without selection
+    return data.to_dict("records"), []
 
 
 @app.callback(
@@ -518,89 +1172,54 @@ def select_scope(scope, selected_scenario, selected_langauges, selected_categori
     Output(scenarioLevels, "options"),
 )
 def update_scenarioLevels(scenario):
-    return list(df.loc[df["scenario"] == scenario]["level"].unique())
+    return dataset.scenario_levels(scenario)
+
+
+def line_figure(graph, store):
+    """output of a line figure, its store when the browser filters the levels"""
+    return Output(store, "data") if args.clientside_levels else Output(graph, "figure")
+
+
+def line_levels(selected_levels):
+    """levels of the line figures built on the server"""
+    return [] if args.clientside_levels else sorted(selected_levels or [])
+
+
+# the selected levels do not reach the server when the browser filters them
+line_levels_dependency = State if args.clientside_levels else Input
+
+
+def selected_names(selected_rows):
+    """names of the frameworks to plot, see selected_frameworks in
+    assets/greenboard.js: the checked ones or every listed one"""
+    return sorted(selected_rows)
+
+
+# the table and each group of figures have their own callback so a change only
+# recomputes what depends on it, e.g. the energy scope leaves the performance
+# figures alone
 
 
 @app.callback(
     Output(rawTable, "columns"),
-    Output(rawTable, "data"),
-    Output(rawTable, "style_data_conditional"),
-    Output(graphs_requests, "figure"),
-    Output(graphs_latency, "figure"),
-    Output(graphs_energy_request, "figure"),
-    Output(graphs_av_power, "figure"),
-    Output(graphs_idle_power, "figure"),
-    # Input(infoTable, "selected_row_ids"),
+    Output(rawTableView, "data"),
+    Output(rawTable, "page_current"),
     Input(selectedRowsStore, "data"),
     Input(energy_scope, "value"),
     State(scenarios, "value"),
     Input(scenarioLevels, "value"),
     prevent_initial_call=True,
 )
-def update_graphs(
-    selected_rows,
-    scope,
-    selected_scenario,
-    selected_levels,
-):
-
-    columns = (
-        basecolumns + cpu_metrics if scope == "cpu" else basecolumns + dram_metrics
-    )
-    metrics = [
-        "RPS",
-        "latencyAvg",
-        f"av_{scope}_per_request",
-        f"av_power_{scope}",
-    ]
-
+def update_table_view(selected_rows, scope, selected_scenario, selected_levels):
     if selected_rows is None or len(selected_rows) == 0:
         return dash.no_update
 
-    rows = [row for row, checked in selected_rows.items() if checked]
-    if len(rows) > 0:
-        data = df.loc[df["name"].isin(rows)]
-    else:
-        data = df.loc[df["name"].isin(selected_rows.keys())]
-
-    data1 = data.loc[
-        data["scenario"] == selected_scenario,
-        [
-            "name",
-            "level",
-            "display_name",
-        ]
-        + columns,
-    ].fillna(0)
-
-    if selected_levels:
-        data1 = data1.loc[data1["level"].isin(selected_levels)]
-
-    figs = [
-        line_plot(
-            data1,
-            selected_scenario,
-            metric,
-        )
-        for metric in metrics
-    ]
-    figs.append(
-        idle_power_plot(
-            data,
-            scope,
-        )
-    )
-
-    res = data1.to_dict(
-        "records",
+    view = dict(
+        rows=selected_names(selected_rows),
+        scope=scope,
+        scenario=selected_scenario,
+        levels=sorted(selected_levels or []),
     )
-    styles = databar_heatmap(data1, column=f"av_power_{scope}")
-    styles += databar_heatmap(
-        data1,
-        column=f"av_{scope}_per_request",
-    )
-    # styles += data_bars(data1, "latency99")
-    styles += data_bars(data1, "totalRequests")
     columns_name = [
         dict(
             id="name",
@@ -617,31 +1236,359 @@ def update_graphs(
             presentation="dropdown",
         ),
     ]
-    return (
-        columns_name + columns_performance + create_energy_columns(scope),
-        res,
-        styles,
-        *figs,
+    return columns_name + columns_performance + create_energy_columns(scope), view, 0
+
+
+def update_line_graphs(group, metrics, rows, scenario, levels, plotted):
+    """line plots of the metrics and what they show,
+    patches of the displayed figures when they already show the same traces"""
+    # plots read the per level statistics, the raw runs stay in the table
+    data1 = summary_view(rows, scenario, levels, metrics)
+    shown = dict(
+        rows=rows,
+        scenario=scenario,
+        traces=[key for key, _ in line_traces(data1)],
+        # svg and WebGL traces are not patched into each other
+        render_mode=line_render_mode(data1),
     )
+    if plotted == shown:
+        return *[patch_line_plot(data1, metric) for metric in metrics], shown
 
+    key = figure_cache.key(
+        group, rows, dataset.revision(rows), scenario, levels, metrics
+    )
+    if (cached := figure_cache.get(key)) is not None:
+        return cached
+    figs = line_figures(data1, scenario, metrics)
+    return figure_cache.set(key, (*figs, shown))
 
-import plotly.graph_objects as go
+
+@app.callback(
+    line_figure(graphs_requests, figures_requests),
+    line_figure(graphs_latency, figures_latency),
+    Output(plottedPerformance, "data"),
+    Input(selectedRowsStore, "data"),
+    State(scenarios, "value"),
+    line_levels_dependency(scenarioLevels, "value"),
+    State(plottedPerformance, "data"),
+    prevent_initial_call=True,
+)
+def update_performance_graphs(
+    selected_rows, selected_scenario, selected_levels, plotted
+):
+    """throughput and latency, they do not depend on the energy scope"""
+    if selected_rows is None or len(selected_rows) == 0:
+        return dash.no_update
+    return update_line_graphs(
+        "performance",
+        ["RPS", "latencyAvg"],
+        selected_names(selected_rows),
+        selected_scenario,
+        line_levels(selected_levels),
+        plotted,
+    )
+
+
+@app.callback(
+    line_figure(graphs_energy_request, figures_energy_request),
+    line_figure(graphs_av_power, figures_av_power),
+    Output(plottedEnergy, "data"),
+    Input(selectedRowsStore, "data"),
+    Input(energy_scope, "value"),
+    State(scenarios, "value"),
+    line_levels_dependency(scenarioLevels, "value"),
+    State(plottedEnergy, "data"),
+    prevent_initial_call=True,
+)
+def update_energy_graphs(
+    selected_rows, scope, selected_scenario, selected_levels, plotted
+):
+    if selected_rows is None or len(selected_rows) == 0:
+        return dash.no_update
+    return update_line_graphs(
+        "energy",
+        [f"av_{scope}_per_request", f"av_power_{scope}"],
+        selected_names(selected_rows),
+        selected_scenario,
+        line_levels(selected_levels),
+        plotted,
+    )
+
+
+@app.callback(
+    Output(graphs_idle_power, "figure"),
+    Output(plottedIdle, "data"),
+    Input(selectedRowsStore, "data"),
+    Input(energy_scope, "value"),
+    State(plottedIdle, "data"),
+    prevent_initial_call=True,
+)
+def update_idle_graph(selected_rows, scope, plotted):
+    """idle baseline, it does not depend on the scenario nor the levels"""
+    if selected_rows is None or len(selected_rows) == 0:
+        return dash.no_update
+    with phase("data"):
+        dt = dataset.idle(selected_names(selected_rows)).fillna(0)
+    shown = dict(names=dt["name"].astype(str).tolist())
+    if plotted == shown:
+        return patch_idle_power_plot(dt, scope), shown
+
+    key = figure_cache.key("idle", shown, dataset.revision(shown["names"]), scope)
+    if (cached := figure_cache.get(key)) is not None:
+        return cached
+    return figure_cache.set(key, (idle_power_plot(dt, scope), shown))
+
+
+@app.callback(
+    Output(graphs_efficiency, "figure"),
+    Output(plottedEfficiency, "data"),
+    Input(selectedRowsStore, "data"),
+    Input(energy_scope, "value"),
+    State(scenarios, "value"),
+    Input(scenarioLevels, "value"),
+    State(plottedEfficiency, "data"),
+    prevent_initial_call=True,
+)
+def update_efficiency_graph(
+    selected_rows, scope, selected_scenario, selected_levels, plotted
+):
+    """efficiency ranking, patched when only the scope changed"""
+    if selected_rows is None or len(selected_rows) == 0:
+        return dash.no_update
+    rows = selected_names(selected_rows)
+    levels = sorted(selected_levels or [])
+    data1 = summary_view(
+        rows, selected_scenario, levels, ["RPS", f"av_{scope}_per_request"]
+    )
+    shown = dict(rows=rows, scenario=selected_scenario, levels=levels)
+    if plotted == shown:
+        return patch_efficiency_plot(data1, scope), shown
+
+    key = figure_cache.key("efficiency", shown, dataset.revision(rows), scope)
+    if (cached := figure_cache.get(key)) is not None:
+        return cached
+    return figure_cache.set(key, (efficiency_plot(data1, scope), shown))
+
+
+if args.clientside_levels:
+    app.clientside_callback(
+        ClientsideFunction(namespace="greenboard", function_name="filter_levels"),
+        Output(graphs_requests, "figure"),
+        Output(graphs_latency, "figure"),
+        Output(graphs_energy_request, "figure"),
+        Output(graphs_av_power, "figure"),
+        Input(scenarioLevels, "value"),
+        Input(figures_requests, "data"),
+        Input(figures_latency, "data"),
+        Input(figures_energy_request, "data"),
+        Input(figures_av_power, "data"),
+        prevent_initial_call=True,
+    )
+
+
+@timed("data")
+def selection_view(rows, scope, scenario, levels):
+    """rows of the selected frameworks shown by the plots and the raw table"""
+    energy_metrics = cpu_metrics if scope == "cpu" else dram_metrics
+    columns = basecolumns + energy_metrics
+    columns += [f"eff_{metric}" for metric in performance_metrics + energy_metrics]
+    data = dataset.select(
+        scenario,
+        rows,
+        levels,
+        columns=["name", "level", "display_name"] + columns,
+    )
+    return data.fillna(dict.fromkeys(data.select_dtypes("number").columns, 0))
+
+
+@timed("data")
+def summary_view(rows, scenario, levels, metrics):
+    """statistics per level of the selected frameworks, read by the plots"""
+    columns = ["name", "level", "display_name", "language"] + metrics
+    columns += [f"{metric}_std" for metric in metrics]
+    columns += [f"eff_{metric}" for metric in metrics]
+    data = dataset.summary(scenario, rows, levels, columns=columns)
+    return data.fillna(dict.fromkeys(data.select_dtypes("number").columns, 0))
+
+
+@app.callback(
+    Input(rawTableView, "data"),
+    Input(rawTable, "page_current"),
+    Input(rawTable, "sort_by"),
+    State(rawTable, "page_size"),
+    Output(rawTable, "data"),
+    Output(rawTable, "style_data_conditional"),
+    Output(rawTable, "page_count"),
+    prevent_initial_call=True,
+)
+def update_table_page(view, page_current, sort_by, page_size):
+    """the raw table only receives the rows of the displayed page,
+    the filtered view stays on the server"""
+    if not view:
+        return dash.no_update
+    data = selection_view(**view)
+    if sort_by:
+        data = data.sort_values(
+            sort_by[0]["column_id"],
+            ascending=sort_by[0]["direction"] == "asc",
+            kind="stable",
+        )
+    page_current = page_current or 0
+    page = data.iloc[page_current * page_size : (page_current + 1) * page_size]
+
+    # colors are scaled on the whole view so they do not change between pages,
+    # only the rows of the page get a style addressed by row index
+    scope = view["scope"]
+    styles = []
+    for column in [f"av_power_{scope}", f"av_{scope}_per_request"]:
+        styles += heatmap_row_styles(
+            page, column, vmin=data[column].min(), vmax=data[column].max()
+        )
+    # styles += bar_row_styles(page, "latency99")
+    styles += bar_row_styles(
+        page,
+        "totalRequests",
+        vmin=data["totalRequests"].min(),
+        vmax=data["totalRequests"].max(),
+    )
+    # the efficiency columns are only used by the plots
+    page = page.loc[:, ~page.columns.str.startswith("eff_")]
+    return page.to_dict("records"), styles, math.ceil(len(data) / page_size)
+
+
+if campaigns is not None:
+
+    @app.callback(
+        Output(compareTable, "columns"),
+        Output(compareTable, "data"),
+        Output(compareTable, "style_data_conditional"),
+        Input(baseline_campaign, "value"),
+        Input(compared_campaign, "value"),
+        Input(selectedRowsStore, "data"),
+        Input(energy_scope, "value"),
+        Input(scenarios, "value"),
+        prevent_initial_call=True,
+    )
+    def compare_campaigns(baseline, compared, selected_rows, scope, scenario):
+        """change of the selected frameworks between two campaigns, per level"""
+        if not baseline or not compared or not selected_rows:
+            return dash.no_update
+        metrics = {
+            "RPS": "RPS",
+            "latencyAvg": "Average Latency",
+            f"av_{scope}_per_request": "Energy per request",
+        }
+        columns = index_columns + list(metrics)
+        names = selected_names(selected_rows)
+        with phase("data"):
+            deltas = campaign_deltas(
+                campaigns.get(baseline).summary(scenario, names, columns=columns),
+                campaigns.get(compared).summary(scenario, names, columns=columns),
+                list(metrics),
+            )
+        styles = change_styles(
+            ["RPS_change"], [f"{metric}_change" for metric in list(metrics)[1:]]
+        )
+        records = deltas.astype(object).where(deltas.notna(), None)
+        return create_comparison_columns(metrics), records.to_dict("records"), styles
+
+
+if traces is not None:
+
+    @app.callback(
+        Output(traceLevel, "options"),
+        Output(traceLevel, "value"),
+        Input(selectedRowsStore, "data"),
+        Input(scenarios, "value"),
+        State(traceLevel, "value"),
+        prevent_initial_call=True,
+    )
+    def update_trace_levels(selected_rows, scenario, level):
+        """levels traced for one of the selected frameworks, the level shown
+        is kept when it still is"""
+        levels = traces.levels(scenario, selected_names(selected_rows or []))
+        if level not in levels:
+            level = levels[0] if levels else None
+        return levels, level
+
+    @app.callback(
+        Output(graphs_trace, "figure"),
+        Input(selectedRowsStore, "data"),
+        Input(energy_scope, "value"),
+        State(scenarios, "value"),
+        Input(traceLevel, "value"),
+        prevent_initial_call=True,
+    )
+    def update_trace_graph(selected_rows, scope, scenario, level):
+        """power of the scope during the last run of every selected framework
+        at one level, each trace reduced to --trace-points with lttb"""
+        if not selected_rows or level is None:
+            return dash.no_update
+        with phase("data"):
+            runs = {
+                name: trace
+                for name in selected_names(selected_rows)
+                if (trace := traces.trace(scenario, name, level)) is not None
+            }
+        return power_trace_plot(runs, scope)
+
+
+@app.server.route("/cache/stats")
+def figure_cache_stats():
+    return figure_cache.stats()
+
+
+@app.server.route("/metrics")
+def prometheus_metrics():
+    """callback histograms of this worker in the prometheus text format"""
+    return callback_metrics.expose(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+
+@app.server.route("/profile")
+def profile_next_callback():
+    """arm the profiler, the next callback served by this worker is profiled"""
+    if not args.profiling:
+        return {"error": "start the dashboard with --profiling"}, 403
+    profiler.arm()
+    return {"armed": True, "pid": os.getpid(), "last": profiler.last}
+
+
+@app.server.route("/profile/last")
+def last_profile():
+    if not args.profiling or profiler.last is None:
+        return {"error": "no profile captured"}, 404
+    if profiler.last.endswith(".html"):
+        with open(profiler.last) as f:
+            return f.read()
+    stats = io.StringIO()
+    pstats.Stats(profiler.last, stream=stats).sort_stats("cumulative").print_stats(40)
+    return stats.getvalue(), 200, {"Content-Type": "text/plain"}
 
 
 @app.callback(
     Input(DownloadBtn, "n_clicks"),
     State(testsuitname, "value"),
+    State(exportFormat, "value"),
     State(energy_scope, "value"),
     State(graphs_requests, "figure"),
     State(graphs_latency, "figure"),
     State(graphs_energy_request, "figure"),
     State(graphs_av_power, "figure"),
     State(graphs_idle_power, "figure"),
+    State(graphs_efficiency, "figure"),
     Output(downloader, "data"),
     prevent_initial_call=True,
+    background=True,
+    manager=jobs_manager,
+    progress=[Output(exportProgress, "value"), Output(exportProgress, "label")],
+    running=[
+        (Output(DownloadBtn, "disabled"), True, False),
+        (Output(cancelExportBtn, "disabled"), False, True),
+        (Output(exportStatus, "style"), {"display": "flex"}, {"display": "none"}),
+    ],
+    cancel=[Input(cancelExportBtn, "n_clicks")],
 )
-def Download(btn, suitnames, scope, *graphs):
-    # TODO : ADD other formats png svg ..etc
+def Download(set_progress, btn, suitnames, fmt, scope, *graphs):
     # TODO : add radar plot for comparaison
     metrics = [
         "RPS",
@@ -649,20 +1596,32 @@ def Download(btn, suitnames, scope, *graphs):
         f"av_{scope}_per_request",
         f"av_power_{scope}",
     ]
-    try:
-        os.mkdir(f"{suitnames}")
-    except FileExistsError:
-        pass
-    figs = [go.Figure(g) for g in graphs]
-    for fig, metric in zip(figs[:-1], metrics):
-        fig.write_image(f"{suitnames}/line_plot_{metric}.pdf")
-    figs[-1].write_image(f"{suitnames}/idle_power.pdf")
-    # download the directory as zip file and delete it
-    shutil.make_archive(suitnames, "zip", suitnames)
-    shutil.rmtree(suitnames)
-    files = dcc.send_file(f"{suitnames}.zip")
-    os.remove(path=f"{suitnames}.zip")
-    return files
+    # figures not drawn yet are exported as an empty page
+    graphs = [go.Figure().to_dict() if graph is None else graph for graph in graphs]
+    named_figures = {
+        f"line_plot_{metric}": graph for metric, graph in zip(metrics, graphs)
+    }
+    named_figures["idle_power"] = graphs[4]
+    named_figures["efficiency"] = graphs[5]
+
+    set_progress((0, "queued"))
+    # bounded so exports cannot starve the interactive callbacks of cpu
+    with job_slot(
+        jobs_cache,
+        args.export_jobs,
+        waiting=lambda seconds: set_progress((0, f"queued {seconds:.0f}s")),
+    ):
+        # rendered concurrently and zipped in memory, nothing touches the disk
+        with phase("export"):
+            archive = zip_figures(
+                named_figures,
+                [fmt or "pdf"],
+                renderers,
+                progress=lambda done, total: set_progress(
+                    (100 * done // total, f"{done}/{total}")
+                ),
+            )
+    return dcc.send_bytes(archive, f"{safe_filename(suitnames)}.zip")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,53 @@
+// clientside callbacks of app.py, they run in the browser without a round-trip
+// to the server
+
+// keep the points of a line trace whose level (x) is selected
+function filterTrace(trace, keep) {
+  if (!Array.isArray(trace.x)) {
+    return trace;
+  }
+  const index = trace.x
+    .map((level, i) => (keep.has(level) ? i : -1))
+    .filter((i) => i >= 0);
+  const pick = (values) =>
+    Array.isArray(values) ? index.map((i) => values[i]) : values;
+  const filtered = Object.assign({}, trace, {
+    x: pick(trace.x),
+    y: pick(trace.y),
+    hovertext: pick(trace.hovertext),
+  });
+  if (trace.error_y) {
+    filtered.error_y = Object.assign({}, trace.error_y, {
+      array: pick(trace.error_y.array),
+    });
+  }
+  return filtered;
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+  greenboard: {
+    // names of the checked frameworks, every listed one when none is checked
+    selected_frameworks: function (selected_row_ids, data) {
+      const names =
+        selected_row_ids && selected_row_ids.length > 0
+          ? selected_row_ids
+          : (data || []).map((row) => row.id);
+      return [...names].sort();
+    },
+
+    // line figures holding every level, drawn with the selected ones only
+    filter_levels: function (levels, ...figures) {
+      if (!levels || levels.length === 0) {
+        return figures.map((figure) => figure || window.dash_clientside.no_update);
+      }
+      const keep = new Set(levels);
+      return figures.map((figure) =>
+        figure
+          ? Object.assign({}, figure, {
+              data: figure.data.map((trace) => filterTrace(trace, keep)),
+            })
+          : window.dash_clientside.no_update
+      );
+    },
+  },
+});
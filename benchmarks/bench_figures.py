@@ -0,0 +1,81 @@
+"""compare the single pass line figure builder of app.py with the one px.line
+call per metric it replaced
+
+    python benchmarks/bench_figures.py [--frameworks 2 10 50 250]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# app.py reads its data files relative to the repository
+os.chdir(os.path.join(os.path.dirname(__file__), ".."))
+
+import plotly.express as px
+
+from app import X_labels, Y_labels, custom_palette, dataset, line_figures, summary_view
+
+METRICS = ["RPS", "latencyAvg", "av_cpu_per_request", "av_power_cpu"]
+
+##BLOCK previous implementation
+
+
+def legacy_line_plot(
+    data1, scenario="db", metric="av_power_cpu", subcategory="language"
+):
+    displaynames = dict(zip(data1["name"], data1["display_name"]))
+
+    labels = Y_labels | {"name": "Frameworks", "level": X_labels[scenario]}
+    fig = px.line(
+        data1,
+        x="level",
+        y=metric,
+        error_y=f"{metric}_std" if f"{metric}_std" in data1 else None,
+        color="name",
+        symbol=subcategory,
+        hover_name="display_name",
+        labels=labels,
+        template="plotly_white",
+        color_discrete_map=custom_palette,
+    )
+    fig.for_each_trace(lambda t: t.update(name=displaynames[t.name.split(",")[0]]))
+    fig.update_layout(legend_title_text="Frameworks")
+    return fig
+
+
+##BLOCK benchmark
+
+engines = {
+    "px.line per metric": lambda data1: [
+        legacy_line_plot(data1, "db", metric) for metric in METRICS
+    ],
+    "single pass builder": lambda data1: line_figures(data1, "db", METRICS),
+}
+
+
+def selection(size, scenario="db"):
+    names = sorted(dataset.state.slices.get(scenario, {}))[:size]
+    return summary_view(names, scenario, [], METRICS)
+
+
+def run(sizes, repeat=3):
+    print(f"{'engine':<24}{'frameworks':>12}{'points':>8}{'time (ms)':>12}")
+    for size in sizes:
+        data1 = selection(size)
+        frameworks = data1["name"].nunique()
+        for name, engine in engines.items():
+            number = 3
+            best = min(
+                timeit.repeat(lambda: engine(data1), number=number, repeat=repeat)
+            )
+            print(
+                f"{name:<24}{frameworks:>12}{len(data1):>8}"
+                f"{best / number * 1000:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frameworks", type=int, nargs="+", default=[2, 10, 50, 250])
+    run(parser.parse_args().frameworks)
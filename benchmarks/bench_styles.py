@@ -0,0 +1,147 @@
+"""compare the conditional style engine of styles.py with the per-row
+implementation it replaced
+
+    python benchmarks/bench_styles.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import os
+import sys
+import timeit
+import warnings
+
+import matplotlib as mpl
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from styles import (
+    bar_row_styles,
+    choose_frontcolor,
+    data_bars,
+    databar_heatmap,
+    heatmap_row_styles,
+)
+
+##BLOCK previous implementation
+
+
+def legacy_databar_heatmap(df, column="av_power_cpu", colormap="RdYlGn_r"):
+    warnings.simplefilter("ignore", mpl.MatplotlibDeprecationWarning)
+    backgroundcolors = mpl.cm.get_cmap(colormap)
+    values = df[column]
+    data_values = dict(zip(values, df[column]))
+    df_max = max(values)
+    df_min = min(values)
+    styles = []
+    for value in values:
+        ratio = (
+            (value - df_min) / (df_max - df_min)
+            if df_max - df_min > 0
+            else (value - df_min)
+        )
+        background = backgroundcolors(ratio)
+        frontcolor = choose_frontcolor(background)
+        styles.append(
+            {
+                "if": {
+                    "filter_query": "{{{}}} = {}".format(column, data_values[value]),
+                    "column_id": column,
+                },
+                "backgroundColor": mpl.colors.to_hex(background),
+                "color": frontcolor,
+            }
+        )
+    return styles
+
+
+def legacy_data_bars(df, column):
+    n_bins = 100
+    bounds = [i * (1.0 / n_bins) for i in range(n_bins + 1)]
+    ranges = [
+        ((df[column].max() - df[column].min()) * i) + df[column].min() for i in bounds
+    ]
+    styles = []
+    for i in range(1, len(bounds)):
+        min_bound = ranges[i - 1]
+        max_bound = ranges[i]
+        max_bound_percentage = bounds[i] * 100
+        styles.append(
+            {
+                "if": {
+                    "filter_query": (
+                        "{{{column}}} >= {min_bound}"
+                        + (
+                            " && {{{column}}} < {max_bound}"
+                            if (i < len(bounds) - 1)
+                            else ""
+                        )
+                    ).format(column=column, min_bound=min_bound, max_bound=max_bound),
+                    "column_id": column,
+                },
+                "background": (
+                    """
+                    linear-gradient(90deg,
+                    #0074D9 0%,
+                    #0074D9 {max_bound_percentage}%,
+                    white {max_bound_percentage}%,
+                    white 100%)
+                """.format(
+                        max_bound_percentage=max_bound_percentage
+                    )
+                ),
+                "paddingBottom": 2,
+                "paddingTop": 2,
+            }
+        )
+
+    return styles
+
+
+##BLOCK benchmark
+
+engines = {
+    "heatmap legacy": lambda df: legacy_databar_heatmap(df, "av_power_cpu"),
+    "heatmap filter_query": lambda df: databar_heatmap(df, "av_power_cpu"),
+    "heatmap row_index (page)": lambda df: heatmap_row_styles(
+        df.head(20),
+        "av_power_cpu",
+        vmin=df["av_power_cpu"].min(),
+        vmax=df["av_power_cpu"].max(),
+    ),
+    "bars legacy": lambda df: legacy_data_bars(df, "totalRequests"),
+    "bars filter_query": lambda df: data_bars(df, "totalRequests"),
+    "bars row_index (page)": lambda df: bar_row_styles(
+        df.head(20),
+        "totalRequests",
+        vmin=df["totalRequests"].min(),
+        vmax=df["totalRequests"].max(),
+    ),
+}
+
+
+def frame(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "av_power_cpu": rng.gamma(4, 20, size).astype("float32"),
+            "totalRequests": rng.integers(1, 2_000_000, size).astype("float64"),
+        }
+    )
+
+
+def run(sizes, repeat=3):
+    print(f"{'engine':<28}{'rows':>8}{'time (ms)':>12}{'rules':>8}")
+    for size in sizes:
+        df = frame(size)
+        for name, engine in engines.items():
+            number = 1 if size >= 100_000 and "legacy" in name else 3
+            best = min(timeit.repeat(lambda: engine(df), number=number, repeat=repeat))
+            rules = len(engine(df))
+            print(f"{name:<28}{size:>8}{best / number * 1000:>12.2f}{rules:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    run(parser.parse_args().sizes)
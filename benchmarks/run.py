@@ -0,0 +1,209 @@
+"""time the hot paths of the dashboard on synthetic datasets and keep the
+results of every commit so regressions show up
+
+    python benchmarks/run.py [--scales 1 10 100 1000] [--skip-export]
+    python benchmarks/run.py --compare <old commit> [<new commit>]
+    GREENBOARD_BACKEND=duckdb python benchmarks/run.py
+
+every scale runs in its own process with the dashboard loading the synthetic
+csv of that scale (see synthetic.py), results are written to
+benchmarks/results/<commit>.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from synthetic import synthetic
+
+# frameworks selected when timing the figures and the exports
+SELECTIONS = [10, 100]
+
+##BLOCK hot paths
+# run inside the worker process, app is imported with the synthetic dataset
+
+
+def hot_paths(app, skip_export=False):
+    """name -> function of the timed code paths"""
+    from styles import data_bars, databar_heatmap
+
+    path = app.args.data_file
+    raw = app.load_data(path)
+    cleaned = app.clean_data(raw)
+    scenario = "db"
+    languages = [option["value"] for option in app.languages]
+    catalogue = app.select_scope("cpu", scenario, languages, {})[0]
+    names = sorted(row["id"] for row in catalogue)
+    runs = app.dataset.select(scenario, names)
+
+    paths = {
+        "load_data": lambda: app.load_data(path),
+        "clean_data": lambda: app.clean_data(raw),
+        "calculate_effeciency": lambda: app.calculate_effeciency(cleaned),
+        "select_scope": lambda: app.select_scope("cpu", scenario, languages, {}),
+        "databar_heatmap": lambda: databar_heatmap(runs, "av_power_cpu"),
+        "data_bars": lambda: data_bars(runs, "totalRequests"),
+    }
+    if app.df is not None:
+        paths["Dataset"] = lambda: app.Dataset(app.df)
+    for size in SELECTIONS:
+        rows = names[:size]
+        paths[f"update_graphs[{size}]"] = lambda rows=rows: update_graphs(
+            app, rows, scenario
+        )
+        view = app.update_table_view(rows, "cpu", scenario, None)[1]
+        paths[f"update_table_page[{size}]"] = lambda view=view: app.update_table_page(
+            view, 0, [], app.PAGE_SIZE
+        )
+        if not skip_export:
+            figures = update_graphs(app, rows, scenario)
+            paths[f"Download[{size}]"] = lambda figures=figures: app.Download(
+                lambda progress: None, 1, "bench", "pdf", "cpu", *figures
+            )
+    return paths
+
+
+def update_graphs(app, rows, scenario, scope="cpu"):
+    """every callback a new selection triggers, without their figure cache"""
+    app.update_table_view(rows, scope, scenario, None)
+    figures = [
+        *app.update_performance_graphs(rows, scenario, None, None)[:2],
+        *app.update_energy_graphs(rows, scope, scenario, None, None)[:2],
+        app.update_idle_graph(rows, scope, None)[0],
+        app.update_efficiency_graph(rows, scope, scenario, None, None)[0],
+    ]
+    return figures
+
+
+def worker(skip_export=False, repeat=3):
+    """time the hot paths of the dataset given to app.py, print them as json"""
+    start = time.perf_counter()
+    import app
+
+    results = {"import app": time.perf_counter() - start, "rows": len(app.dataset)}
+    for name, path in hot_paths(app, skip_export).items():
+        path()  # warm up (caches, kaleido processes)
+        results[name] = min(timeit.repeat(path, number=1, repeat=repeat))
+    print(json.dumps(results))
+
+
+##BLOCK results
+
+
+def git(*command):
+    return subprocess.run(
+        ["git", *command], cwd=ROOT, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def run(scales, skip_export=False, repeat=3):
+    commit = git("rev-parse", "HEAD")
+    report = {
+        "commit": commit,
+        "subject": git("log", "-1", "--format=%s"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": f"{platform.machine()} {os.cpu_count()} cpus",
+        "results": {},
+    }
+    for scale in scales:
+        env = dict(
+            os.environ,
+            GREENBOARD_DATA_FILE=synthetic(scale),
+            # every call builds its figures
+            GREENBOARD_FIGURE_CACHE_SIZE="0",
+            GREENBOARD_RENDERERS="1",
+        )
+        command = [sys.executable, __file__, "--worker", "--repeat", str(repeat)]
+        if skip_export:
+            command.append("--skip-export")
+        output = subprocess.run(
+            command, cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        report["results"][str(scale)] = json.loads(output.strip().splitlines()[-1])
+        print_results(scale, report["results"][str(scale)])
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{commit[:12]}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"written to {os.path.relpath(path, ROOT)}")
+
+
+def print_results(scale, results):
+    print(f"\nscale {scale}x ({results['rows']} rows)")
+    for name, seconds in results.items():
+        if name != "rows":
+            print(f"  {name:<28}{seconds * 1000:>12.2f} ms")
+
+
+def load_report(ref):
+    """results of a commit (any unambiguous prefix) or of a json file"""
+    if os.path.exists(ref):
+        path = ref
+    else:
+        commit = git("rev-parse", ref) or ref
+        matches = glob.glob(os.path.join(RESULTS_DIR, f"{commit[:12]}*.json"))
+        if not matches:
+            sys.exit(f"no benchmark results for {ref}, run benchmarks/run.py first")
+        path = matches[0]
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(old, new, threshold=1.1):
+    """ratio new / old of every timing, flags the slowdowns above threshold"""
+    old, new = load_report(old), load_report(new)
+    print(f"old {old['commit'][:12]} {old['subject']}")
+    print(f"new {new['commit'][:12]} {new['subject']}")
+    regressions = 0
+    for scale, results in new["results"].items():
+        before = old["results"].get(scale, {})
+        print(f"\nscale {scale}x")
+        for name, seconds in results.items():
+            if name == "rows" or name not in before:
+                continue
+            ratio = seconds / before[name] if before[name] else float("inf")
+            flag = "  slower" if ratio > threshold else ""
+            regressions += bool(flag)
+            print(
+                f"  {name:<28}{before[name] * 1000:>12.2f}{seconds * 1000:>12.2f} ms"
+                f"{ratio:>8.2f}x{flag}"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--skip-export", action="store_true", help="do not render the exports"
+    )
+    parser.add_argument(
+        "--compare",
+        nargs="+",
+        metavar="COMMIT",
+        help="compare the results of two commits (the second defaults to HEAD)",
+    )
+    parser.add_argument("--threshold", type=float, default=1.1)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args.skip_export, args.repeat)
+    elif args.compare:
+        old, new = (args.compare + ["HEAD"])[:2]
+        sys.exit(1 if compare(old, new, args.threshold) else 0)
+    else:
+        run(args.scales, args.skip_export, args.repeat)
@@ -0,0 +1,85 @@
+"""generate recap_frameworkbenchmark.csv shaped data at a multiple of its size
+
+    python benchmarks/synthetic.py --scale 10 [-o .cache/bench/recap_x10.csv]
+
+every copy of the source adds one variant of each framework: the fields
+identifying a framework get a suffix, its categories (language, database,
+orm...) are kept so their cardinalities stay realistic, and the measures are
+jittered around the source values
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+SOURCE = os.path.join(ROOT, "recap_frameworkbenchmark.csv")
+OUTPUT_DIR = os.path.join(ROOT, ".cache", "bench")
+
+# one distinct value per framework, suffixed in every copy
+FRAMEWORK_COLUMNS = ["name", "display_name", "framework"]
+# measures of a run, multiplied by a log-normal noise
+MEASURE_COLUMNS = [
+    "latencyAvg",
+    "latencyMax",
+    "latencyStdev",
+    "totalRequests",
+    "latency99",
+    "cpu_0",
+    "dram_0",
+    "cpu",
+    "dram",
+]
+NOISE = 0.05
+# copies written at once, bounds the memory used by the large scales
+CHUNK = 10
+
+
+def synthetic_path(scale, seed=0):
+    return os.path.join(OUTPUT_DIR, f"recap_x{scale}_s{seed}.csv")
+
+
+def variant(source, copy, rng):
+    """one copy of the source, copy 0 keeps the names of the frameworks"""
+    data = source.copy()
+    if copy:
+        for col in FRAMEWORK_COLUMNS:
+            data[col] = data[col].mask(data[col].notna(), data[col] + f"~{copy}")
+    noise = rng.lognormal(0, NOISE, size=(len(data), len(MEASURE_COLUMNS)))
+    data[MEASURE_COLUMNS] = data[MEASURE_COLUMNS].to_numpy() * noise
+    # request counters stay integral
+    data["totalRequests"] = data["totalRequests"].round()
+    return data
+
+
+def write_synthetic(scale, path=None, seed=0, source=SOURCE):
+    """write `scale` copies of the source to path (streamed chunk by chunk)"""
+    path = path or synthetic_path(scale, seed)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    for start in range(0, scale, CHUNK):
+        copies = range(start, min(start + CHUNK, scale))
+        chunk = pd.concat([variant(data, copy, rng) for copy in copies])
+        chunk.to_csv(tmp, mode="a" if start else "w", header=not start, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def synthetic(scale, seed=0, source=SOURCE):
+    """path of the synthetic csv, generated the first time it is asked for"""
+    path = synthetic_path(scale, seed)
+    if not os.path.exists(path):
+        write_synthetic(scale, path, seed, source)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="defaults to .cache/bench/")
+    args = parser.parse_args()
+    print(write_synthetic(args.scale, args.output, args.seed))
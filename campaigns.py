@@ -0,0 +1,66 @@
+import os
+import threading
+from collections import OrderedDict
+
+from dataset import index_columns
+from storage import MANIFEST
+
+# datasets of campaigns kept loaded, the least recently compared are dropped
+LOADED_CAMPAIGNS = 4
+
+
+class Campaigns:
+    """benchmark campaigns (e.g. one per hardware setup, kernel or framework
+    upgrade) stored side by side in a directory, each one as a csv or as a
+    store built by ingest.py
+
+    a campaign is only loaded, by open_dataset, the first time it is read"""
+
+    def __init__(self, directory, open_dataset, maxsize=LOADED_CAMPAIGNS):
+        self.directory = directory
+        self.open_dataset = open_dataset
+        self.maxsize = maxsize
+        self.loaded = OrderedDict()
+        self.lock = threading.Lock()
+
+    def sources(self):
+        """campaign name -> path of its csv or store"""
+        sources = {}
+        for entry in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, entry)
+            name, ext = os.path.splitext(entry)
+            if os.path.isfile(os.path.join(path, MANIFEST)):
+                sources[entry] = path
+            elif ext == ".csv":
+                sources[name] = path
+        return sources
+
+    def names(self):
+        return list(self.sources())
+
+    def get(self, name):
+        # loading under the lock, concurrent callbacks wait for the first load
+        # of a campaign instead of all loading it
+        with self.lock:
+            if name not in self.loaded:
+                self.loaded[name] = self.open_dataset(self.sources()[name])
+                while len(self.loaded) > self.maxsize:
+                    self.loaded.popitem(last=False)
+            self.loaded.move_to_end(name)
+            return self.loaded[name]
+
+
+def campaign_deltas(baseline, compared, metrics):
+    """per (scenario, name, level) change of the metrics between the summary
+    tables of two campaigns: both values, their difference and its ratio to
+    the baseline. levels only measured in one campaign are left out"""
+    joined = baseline[index_columns + metrics].merge(
+        compared[index_columns + metrics],
+        on=index_columns,
+        suffixes=("_baseline", "_compared"),
+    )
+    for metric in metrics:
+        before, after = joined[f"{metric}_baseline"], joined[f"{metric}_compared"]
+        joined[f"{metric}_delta"] = after - before
+        joined[f"{metric}_change"] = (after - before) / before.where(before != 0)
+    return joined.sort_values(index_columns, kind="stable").reset_index(drop=True)
@@ -1,3 +1,4 @@
+from dash.dash_table import FormatTemplate
 from dash.dash_table.Format import Format, Symbol, Scheme
 
 columns_name = [
@@ -108,3 +109,31 @@ def create_energy_columns(energy_domain="cpu"):
         ),
     ]
     return columns_energy
+
+
+def create_comparison_columns(metrics):
+    """values of both campaigns and relative change of every metric (id ->
+    header), grouped under a header per metric"""
+    columns = [
+        dict(id="name", name=["", "name"]),
+        dict(id="level", name=["", "level"]),
+    ]
+    for metric, header in metrics.items():
+        columns += [
+            dict(
+                id=f"{metric}_{campaign}",
+                name=[header, campaign],
+                type="numeric",
+                format=Format(precision=3, scheme=Scheme.decimal_si_prefix),
+            )
+            for campaign in ["baseline", "compared"]
+        ]
+        columns.append(
+            dict(
+                id=f"{metric}_change",
+                name=[header, "change"],
+                type="numeric",
+                format=FormatTemplate.percentage(1).sign("+"),
+            )
+        )
+    return columns
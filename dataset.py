@@ -0,0 +1,389 @@
+from collections import namedtuple
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from labels import categories, efficiency_metrics
+from storage import keep_blocks
+
+index_columns = ["scenario", "name", "level"]
+catalogue_columns = ["name", "display_name", "language"] + categories
+# statistics of the repeated runs of a (scenario, name, level) kept in the
+# summary table, the mean keeps the name of the metric, the others get a suffix
+summary_stats = ["mean", "median", "std", "count", "min", "max"]
+# columns of the catalogue indexed with bitmaps
+filter_columns = ["scenario", "language"] + categories
+
+POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+class BitmapIndex:
+    """one packed bitset per distinct value of each indexed column
+
+    a filter made of "column in values" clauses compiles to a bitwise OR
+    per column and a bitwise AND across columns"""
+
+    def __init__(self, data, columns):
+        self.size = len(data)
+        self.bitmaps = {}
+        for col in columns:
+            values = data[col].astype("category")
+            codes = values.cat.codes.to_numpy()
+            self.bitmaps[col] = {
+                value: np.packbits(codes == code)
+                for code, value in enumerate(values.cat.categories)
+            }
+
+    def everything(self):
+        return np.packbits(np.ones(self.size, dtype=bool))
+
+    def nothing(self):
+        return np.packbits(np.zeros(self.size, dtype=bool))
+
+    def match(self, col, values):
+        """bitset of the rows where col is one of values"""
+        bitmaps = self.bitmaps[col]
+        return reduce(
+            np.bitwise_or,
+            [bitmaps[value] for value in values if value in bitmaps],
+            self.nothing(),
+        )
+
+    def query(self, filters):
+        """bitset of the rows matching every clause of filters"""
+        bits = self.everything()
+        for col, values in filters.items():
+            bits &= self.match(col, values)
+        return bits
+
+    def count(self, bits):
+        return int(POPCOUNT[bits].sum())
+
+    def rows(self, bits):
+        return np.flatnonzero(np.unpackbits(bits, count=self.size))
+
+    def facets(self, filters, columns):
+        """number of matching rows for every value of the columns, each column
+        being counted without its own clause so alternatives stay visible"""
+        counts = {}
+        for col in columns:
+            base = self.query({c: v for c, v in filters.items() if c != col})
+            counts[col] = {
+                value: self.count(base & bitmap)
+                for value, bitmap in self.bitmaps[col].items()
+            }
+        return counts
+
+
+def sort_frame(data):
+    """rows in the order of the index, the frame is left untouched (and not
+    copied) when it is already sorted, e.g. attached from a shared file"""
+    keys = pd.MultiIndex.from_arrays([data[col] for col in index_columns])
+    if keys.is_monotonic_increasing:
+        return data
+    return data.sort_values(index_columns, kind="stable")
+
+
+def runs(values):
+    """(value, start, stop) of every run of equal consecutive values"""
+    values = np.asarray(values)
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    stops = np.r_[starts[1:], len(values)]
+    return zip(values[starts], starts, stops)
+
+
+def partition(data):
+    """split a frame sorted by index_columns in one view per scenario and map
+    every framework to the slice of its rows inside the partition
+
+    positional slices are views, partitions do not copy the frame"""
+    partitions, slices = {}, {}
+    scenarios = data["scenario"].cat
+    for code, start, stop in runs(scenarios.codes):
+        scenario = scenarios.categories[code]
+        part = keep_blocks(data.iloc[start:stop])
+        names = part["name"].cat.categories
+        partitions[scenario] = part
+        slices[scenario] = {
+            names[code]: slice(start, stop)
+            for code, start, stop in runs(part["name"].cat.codes)
+        }
+    return partitions, slices
+
+
+def summarize(data):
+    """one row per (scenario, name, level) with the statistics of its runs"""
+    grouped = data.groupby(index_columns, observed=True)
+    stats = grouped[efficiency_metrics].agg(summary_stats)
+    stats.columns = [
+        metric if stat == "mean" else f"{metric}_{stat}"
+        for metric, stat in stats.columns
+    ]
+    efficiency = [f"eff_{metric}" for metric in efficiency_metrics]
+    # first of groupby loops over the groups in python on categorical columns
+    names = data.drop_duplicates(index_columns).set_index(index_columns)
+    return pd.concat(
+        [
+            names[["display_name", "language"]].reindex(stats.index),
+            stats,
+            grouped[efficiency].mean(),
+        ],
+        axis=1,
+    ).reset_index()
+
+
+def distinct_frameworks(data):
+    """distinct frameworks of every scenario and their categories"""
+    return (
+        data[["scenario"] + catalogue_columns].drop_duplicates().reset_index(drop=True)
+    )
+
+
+def extend_categories(data, rows):
+    """data and rows with the same categories, the values new to data are
+    appended after its own so the codes of the existing rows do not change"""
+    data, rows = data.copy(deep=False), rows.copy(deep=False)
+    for col in data.select_dtypes("category"):
+        if col not in rows:
+            continue
+        known = data[col].cat.categories
+        values = pd.Index(rows[col].dropna().astype(object).unique())
+        new = values[~values.isin(known)]
+        if len(new):
+            data[col] = data[col].cat.add_categories(new)
+        rows[col] = rows[col].astype(data[col].dtype)
+    return data, rows
+
+
+def take(partition, slices, names, levels=None, columns=None):
+    """rows of the given frameworks in the partition of a scenario"""
+    selected = [slices[name] for name in names if name in slices]
+    positions = (
+        np.concatenate([np.arange(run.start, run.stop) for run in selected])
+        if selected
+        else np.empty(0, dtype=int)
+    )
+    data = partition.iloc[positions]
+    if levels:
+        data = data.loc[data["level"].isin(levels)]
+    if columns is not None:
+        data = data[columns]
+    return data
+
+
+# everything derived from one version of the frame, see Dataset.index
+DatasetState = namedtuple(
+    "DatasetState",
+    [
+        "data",
+        "partitions",
+        "slices",
+        "levels",
+        "summary_rows",
+        "summaries",
+        "summary_slices",
+        "idle_baseline",
+        "catalogue_rows",
+        "bitmaps",
+        "revisions",
+    ],
+)
+
+
+class DatasetBackend:
+    """read side of the benchmark results used by the callbacks, held in
+    memory by Dataset or queried from parquet files by DuckDBDataset
+
+    a backend also exposes catalogue_rows, the distinct frameworks of every
+    scenario and their categories, which feed the filter options, and source,
+    the cache it was read from, whose name changes with the content of the
+    data file"""
+
+    source = None
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def scenario_levels(self, scenario):
+        """levels of the runs of a scenario, in increasing order"""
+        raise NotImplementedError
+
+    def filters(self, scenario, languages, selected_categories=None):
+        """"column in values" clauses of a selection, an empty category filter
+        means all"""
+        return {
+            "scenario": [scenario],
+            "language": languages or [],
+            **{cat: vals for cat, vals in (selected_categories or {}).items() if vals},
+        }
+
+    def catalogue(self, scenario, languages, selected_categories=None):
+        """distinct frameworks (and their categories) of a scenario
+        written in one of the languages and matching the category filters"""
+        raise NotImplementedError
+
+    def facets(self, scenario, languages, selected_categories=None):
+        """number of frameworks behind each value of the category filters"""
+        raise NotImplementedError
+
+    def select(self, scenario, names, levels=None, columns=None):
+        """rows of the given frameworks for one scenario"""
+        raise NotImplementedError
+
+    def summary(self, scenario, names, levels=None, columns=None):
+        """statistics per level of the given frameworks for one scenario"""
+        raise NotImplementedError
+
+    def idle(self, names):
+        """idle baseline of the given frameworks"""
+        raise NotImplementedError
+
+    def revision(self, names):
+        """revisions of the rows of the frameworks, 0 until they are updated"""
+        raise NotImplementedError
+
+
+class Dataset(DatasetBackend):
+    """read side of the benchmark results used by the callbacks
+
+    the frame is sorted once by (scenario, name, level) and split per
+    scenario, every (scenario, name) pair maps to a slice of its partition
+    so a selection is resolved with dict lookups instead of scanning
+    the whole table. the statistics of repeated runs are aggregated once
+    in a summary table indexed the same way
+
+    the frame and its indexes are one immutable state replaced as a whole by
+    update(), every method reads self.state once"""
+
+    def __init__(self, data, source=None):
+        self.source = source
+        data = sort_frame(data)
+        self.index(data, summarize(data), distinct_frameworks(data), {})
+
+    @property
+    def data(self):
+        return self.state.data
+
+    @property
+    def catalogue_rows(self):
+        return self.state.catalogue_rows
+
+    def index(self, data, summary_rows, catalogue_rows, revisions):
+        """derive the partitions and indexes of the frame and its summary,
+        they are swapped in at once so callbacks never mix two versions"""
+        partitions, slices = partition(data)
+        summaries, summary_slices = partition(summary_rows)
+        self.state = DatasetState(
+            data=data,
+            partitions=partitions,
+            slices=slices,
+            levels={
+                scenario: np.unique(part["level"]).tolist()
+                for scenario, part in partitions.items()
+            },
+            summary_rows=summary_rows,
+            summaries=summaries,
+            summary_slices=summary_slices,
+            # idle power of every framework, averaged over its idle runs
+            idle_baseline=summaries.get("idle", summary_rows.iloc[:0]).set_index(
+                "name", drop=False
+            ),
+            # distinct frameworks of every scenario and their categories
+            catalogue_rows=catalogue_rows,
+            bitmaps=BitmapIndex(catalogue_rows, filter_columns),
+            # revision of the rows of the frameworks changed by update()
+            revisions=revisions,
+        )
+
+    def update(self, rows, revision):
+        """replace the rows of every (scenario, name) found in rows
+
+        only the statistics of these frameworks are aggregated again, the
+        summaries of the others are kept. their names get the given revision"""
+        state = self.state
+        data, rows = extend_categories(state.data, rows)
+        summary_rows, summary = extend_categories(state.summary_rows, summarize(rows))
+        catalogue_rows, catalogue = extend_categories(
+            state.catalogue_rows, distinct_frameworks(rows)
+        )
+        keys = pd.MultiIndex.from_frame(rows[["scenario", "name"]].astype(object))
+
+        def replace(old, new):
+            stale = pd.MultiIndex.from_frame(old[["scenario", "name"]].astype(object))
+            kept = old.loc[~stale.isin(keys.unique())]
+            return pd.concat([kept, new], ignore_index=True)
+
+        self.index(
+            sort_frame(replace(data, rows)),
+            sort_frame(replace(summary_rows, summary)).reset_index(drop=True),
+            replace(catalogue_rows, catalogue)
+            .sort_values(["scenario", "name"], kind="stable")
+            .reset_index(drop=True),
+            {
+                **state.revisions,
+                **dict.fromkeys(rows["name"].astype(str).unique(), revision),
+            },
+        )
+
+    def rows(self, keys):
+        """every row of the given (scenario, name) pairs"""
+        state = self.state
+        by_scenario = {}
+        for scenario, name in keys:
+            by_scenario.setdefault(scenario, []).append(name)
+        return pd.concat(
+            [state.data.iloc[:0]]
+            + [
+                take(state.partitions[scenario], state.slices[scenario], names)
+                for scenario, names in by_scenario.items()
+                if scenario in state.partitions
+            ]
+        )
+
+    def revision(self, names):
+        """revisions of the rows of the frameworks, 0 until they are updated"""
+        revisions = self.state.revisions
+        return [revisions.get(name, 0) for name in names]
+
+    def __len__(self):
+        return len(self.state.data)
+
+    def scenario_levels(self, scenario):
+        return self.state.levels.get(scenario, [])
+
+    def catalogue(self, scenario, languages, selected_categories=None):
+        """distinct frameworks (and their categories) of a scenario
+        written in one of the languages and matching the category filters"""
+        state = self.state
+        bits = state.bitmaps.query(
+            self.filters(scenario, languages, selected_categories)
+        )
+        return state.catalogue_rows.iloc[state.bitmaps.rows(bits)][catalogue_columns]
+
+    def facets(self, scenario, languages, selected_categories=None):
+        """number of frameworks behind each value of the category filters"""
+        return self.state.bitmaps.facets(
+            self.filters(scenario, languages, selected_categories), categories
+        )
+
+    def select(self, scenario, names, levels=None, columns=None):
+        """rows of the given frameworks for one scenario"""
+        state = self.state
+        partition = state.partitions.get(scenario, state.data.iloc[:0])
+        return take(partition, state.slices.get(scenario, {}), names, levels, columns)
+
+    def summary(self, scenario, names, levels=None, columns=None):
+        """statistics per level of the given frameworks for one scenario"""
+        state = self.state
+        partition = state.summaries.get(scenario, state.summary_rows.iloc[:0])
+        slices = state.summary_slices.get(scenario, {})
+        return take(partition, slices, names, levels, columns)
+
+    def idle(self, names):
+        """idle baseline of the given frameworks"""
+        baseline = self.state.idle_baseline
+        return baseline.loc[
+            [name for name in names if name in baseline.index]
+        ].reset_index(drop=True)
+
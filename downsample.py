@@ -0,0 +1,60 @@
+import numpy as np
+
+# both functions return the (sorted) positions of the points to keep so every
+# array of a trace (hover text, error bars...) can be thinned the same way
+
+
+def evenly(size, n):
+    return np.unique(np.linspace(0, size - 1, max(n, 1)).round().astype(int))
+
+
+def lttb(x, y, n):
+    """positions of the n points kept by largest triangle three buckets,
+    the first and last points are always kept"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return evenly(size, n)
+
+    # n - 2 buckets between the first and the last point
+    edges = np.linspace(1, size - 1, n - 1).astype(int)
+    # average point of every bucket, then the last point, computed at once
+    counts = np.diff(edges)
+    mean_x = np.r_[np.add.reduceat(x[: size - 1], edges[:-1]) / counts, x[-1]]
+    mean_y = np.r_[np.add.reduceat(y[: size - 1], edges[:-1]) / counts, y[-1]]
+    kept = np.empty(n, dtype=int)
+    kept[0], kept[-1] = 0, size - 1
+    for i in range(n - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_x, next_y = mean_x[i + 1], mean_y[i + 1]
+        a = kept[i]
+        areas = np.abs(
+            (x[a] - next_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (next_y - y[a])
+        )
+        kept[i + 1] = start + np.argmax(np.nan_to_num(areas, nan=-1))
+    return kept
+
+
+def minmax(x, y, n):
+    """positions of the lowest and highest point of (n - 2) // 2 buckets,
+    the first and last points are always kept"""
+    y = np.asarray(y, dtype=float)
+    size = len(y)
+    if n >= size:
+        return np.arange(size)
+    if n < 4:
+        return evenly(size, n)
+    buckets = (n - 2) // 2
+    bucket = np.arange(size) * buckets // size
+    # sorted by bucket then value, a bucket starts with its min, ends with its max
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket[order], np.arange(buckets))
+    stops = np.r_[starts[1:], size] - 1
+    return np.unique(np.r_[0, order[starts], order[stops], size - 1])
+
+
+DOWNSAMPLERS = {"lttb": lttb, "minmax": minmax}
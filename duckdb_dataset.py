@@ -0,0 +1,176 @@
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from dataset import DatasetBackend, catalogue_columns, distinct_frameworks, summarize
+from labels import categories
+
+try:
+    import duckdb
+except ImportError:  # optional, only needed by --backend duckdb
+    duckdb = None
+
+# rows per parquet row group, frameworks are sorted so a selection only reads
+# the groups whose name statistics overlap it
+ROW_GROUP = 1 << 16
+# column -> its name in the parquet files, see stored_names
+COLUMNS = "columns.json"
+
+
+def stored_names(columns):
+    """column -> name in the parquet files, duckdb does not tell apart names
+    only differing by case (e.g. rps printed by wrk and the derived RPS)"""
+    names, seen = {}, set()
+    for col in columns:
+        name = col
+        while name.lower() in seen:
+            name += "_"
+        seen.add(name.lower())
+        names[col] = name
+    return names
+
+
+def write_partitioned(data, directory):
+    """write the cleaned runs, their summaries and the catalogue of frameworks
+    as parquet, the runs and summaries partitioned by scenario"""
+    summary, catalogue = summarize(data), distinct_frameworks(data)
+    names = stored_names(dict.fromkeys([*data, *summary, *catalogue]))
+    for table, rows in [("runs", data), ("summary", summary)]:
+        ds.write_dataset(
+            pa.Table.from_pandas(rows.rename(columns=names), preserve_index=False),
+            os.path.join(directory, table),
+            format="parquet",
+            partitioning=["scenario"],
+            partitioning_flavor="hive",
+            max_rows_per_group=ROW_GROUP,
+            existing_data_behavior="delete_matching",
+        )
+    ds.write_dataset(
+        pa.Table.from_pandas(catalogue.rename(columns=names), preserve_index=False),
+        os.path.join(directory, "catalogue"),
+        format="parquet",
+    )
+    with open(os.path.join(directory, COLUMNS), "w") as f:
+        json.dump(names, f)
+
+
+def placeholders(values):
+    return ", ".join("?" for _ in values)
+
+
+class DuckDBDataset(DatasetBackend):
+    """same read side as Dataset, queried with duckdb from the parquet files
+    written by write_partitioned instead of held in memory
+
+    the scenario is a partition of the files and the frameworks are sorted
+    within it, duckdb only reads the partition, the row groups and the columns
+    a selection needs. the catalogue of frameworks is small and kept in memory
+    for the filter options"""
+
+    def __init__(self, directory):
+        if duckdb is None:
+            raise ImportError("--backend duckdb needs the duckdb package")
+        self.directory = self.source = directory
+        with open(os.path.join(directory, COLUMNS)) as f:
+            self.names = json.load(f)
+        self.columns = {name: col for col, name in self.names.items()}
+        self.connection = duckdb.connect()
+        for table, partitioned in [("runs", 1), ("summary", 1), ("catalogue", 0)]:
+            path = os.path.join(directory, table, "**", "*.parquet")
+            self.connection.execute(
+                f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{path}', "
+                f"hive_partitioning = {partitioned}, union_by_name = true)"
+            )
+        self.catalogue_rows = self.query(
+            f"SELECT {self.quote(['scenario'] + catalogue_columns)} FROM catalogue"
+        )
+        levels = self.query("SELECT DISTINCT scenario, level FROM summary ORDER BY 2")
+        self.levels = levels.groupby("scenario")["level"].agg(list).to_dict()
+        self.revisions = {}
+
+    def query(self, sql, parameters=None):
+        # a cursor per query, callbacks run in several threads
+        data = self.connection.cursor().execute(sql, parameters).df()
+        return data.rename(columns=self.columns)
+
+    def quote(self, columns):
+        return ", ".join(f'"{self.names.get(col, col)}"' for col in columns)
+
+    def __len__(self):
+        return int(self.query("SELECT count(*) AS n FROM runs")["n"].iloc[0])
+
+    def scenario_levels(self, scenario):
+        return self.levels.get(scenario, [])
+
+    def where(self, filters):
+        """sql condition and parameters of "column in values" clauses"""
+        clauses = [
+            f"{self.quote([col])} IN ({placeholders(values)})"
+            for col, values in filters.items()
+        ]
+        parameters = [value for values in filters.values() for value in values]
+        return " AND ".join(clauses) or "true", parameters
+
+    def catalogue(self, scenario, languages, selected_categories=None):
+        filters = self.filters(scenario, languages, selected_categories)
+        if not all(filters.values()):
+            return self.catalogue_rows.iloc[:0][catalogue_columns]
+        where, parameters = self.where(filters)
+        return self.query(
+            f"SELECT {self.quote(catalogue_columns)} FROM catalogue WHERE {where} "
+            "ORDER BY name",
+            parameters,
+        )
+
+    def facets(self, scenario, languages, selected_categories=None):
+        """number of frameworks behind each value of the category filters,
+        each column being counted without its own clause"""
+        filters = self.filters(scenario, languages, selected_categories)
+        counts = {}
+        for col in categories:
+            others = {c: v for c, v in filters.items() if c != col}
+            where, parameters = self.where(others)
+            if not all(others.values()):
+                where, parameters = "false", []
+            rows = self.query(
+                f"SELECT {self.quote([col])} AS value, "
+                f"count(*) FILTER (WHERE {where}) AS n FROM catalogue "
+                "WHERE value IS NOT NULL GROUP BY 1 ORDER BY 1",
+                parameters,
+            )
+            counts[col] = dict(zip(rows["value"], rows["n"].astype(int)))
+        return counts
+
+    def _query_rows(self, table, scenario, names, levels=None, columns=None):
+        """rows of the given frameworks in one scenario of a table"""
+        names = list(names)
+        if not names:
+            columns = columns or list(self.query(f"SELECT * FROM {table} LIMIT 0"))
+            return pd.DataFrame(columns=columns)
+        filters = {"scenario": [scenario], "name": names}
+        if levels:
+            filters["level"] = levels
+        where, parameters = self.where(filters)
+        return self.query(
+            f"SELECT {self.quote(columns) if columns else '*'} FROM {table} "
+            f"WHERE {where} ORDER BY list_position(?, name), level",
+            parameters + [names],
+        )
+
+    def select(self, scenario, names, levels=None, columns=None):
+        """rows of the given frameworks for one scenario"""
+        return self._query_rows("runs", scenario, names, levels, columns)
+
+    def summary(self, scenario, names, levels=None, columns=None):
+        """statistics per level of the given frameworks for one scenario"""
+        return self._query_rows("summary", scenario, names, levels, columns)
+
+    def idle(self, names):
+        """idle baseline of the given frameworks"""
+        return self.summary("idle", names)
+
+    def revision(self, names):
+        return [self.revisions.get(name, 0) for name in names]
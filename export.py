@@ -0,0 +1,247 @@
+import io
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+import traceback
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from multiprocessing.managers import BaseManager
+
+import plotly.io as pio
+import psutil
+from kaleido.scopes.plotly import PlotlyScope
+
+from styles import plot_config
+
+EXPORT_FORMATS = {
+    "pdf": "PDF",
+    "png": "PNG",
+    "svg": "SVG",
+    "html": "Interactive HTML",
+}
+# kaleido formats, html is written by plotly itself
+IMAGE_FORMATS = ["pdf", "png", "svg"]
+
+
+def figure_dict(figure):
+    """plotly figure as the dict kaleido renders"""
+    if hasattr(figure, "to_dict"):
+        return figure.to_dict()
+    return figure
+
+
+def render_many(render, jobs, executor, progress=None):
+    """render(figure, format) of every (figure, format) pair, concurrently on
+    the executor, results keep the order. progress(done, total) is called each
+    time a render finishes"""
+    futures = {executor.submit(render, *job): i for i, job in enumerate(jobs)}
+    results = [None] * len(jobs)
+    for done, future in enumerate(as_completed(futures), start=1):
+        results[futures[future]] = future.result()
+        if progress is not None:
+            progress(done, len(jobs))
+    return results
+
+
+class RendererPool:
+    """pool of kaleido scopes, each one keeps its own chromium process alive
+    so renders run concurrently and skip the startup cost after the first one
+
+    a scope is only used by one thread at a time. a forked process (e.g. a
+    background job) starts with an empty pool, chromium processes and
+    threads do not survive the fork"""
+
+    def __init__(self, size=4):
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(self.size, thread_name_prefix="kaleido")
+
+    def check_fork(self):
+        if self.pid != os.getpid():
+            self.reset()
+
+    def new_scope(self):
+        # same configuration as the scope plotly.io uses (local plotly.js, no mathjax)
+        return PlotlyScope(
+            plotlyjs=pio.kaleido.scope.plotlyjs, mathjax=pio.kaleido.scope.mathjax
+        )
+
+    def acquire(self):
+        self.check_fork()
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                return self.new_scope()
+        return self.idle.get()
+
+    def render(self, figure, fmt="pdf"):
+        """bytes of the figure in the given format"""
+        figure = figure_dict(figure)
+        if fmt == "html":
+            return pio.to_html(figure, include_plotlyjs="cdn").encode()
+        options = plot_config["toImageButtonOptions"]
+        scope = self.acquire()
+        try:
+            return scope.transform(
+                figure,
+                format=fmt,
+                width=options["width"],
+                height=options["height"],
+                scale=options["scale"],
+            )
+        finally:
+            self.idle.put(scope)
+
+    def render_many(self, jobs, progress=None):
+        """see render_many"""
+        self.check_fork()
+        return render_many(self.render, jobs, self.executor, progress)
+
+    def warm_up(self):
+        """start every chromium process in the background"""
+        self.check_fork()
+        blank = {"data": [], "layout": {}}
+        for _ in range(self.size):
+            self.executor.submit(self.render, blank, "svg")
+
+
+# pool of the render process, see RenderService
+service_pool = None
+service_lock = threading.Lock()
+
+
+def serve_pool(size):
+    """RendererPool of the render process, started by its first client"""
+    global service_pool
+    with service_lock:
+        if service_pool is None:
+            service_pool = RendererPool(size)
+            service_pool.warm_up()
+    return service_pool
+
+
+class RendererManager(BaseManager):
+    pass
+
+
+RendererManager.register("pool", serve_pool, exposed=["render"])
+
+
+class RenderService:
+    """RendererPool living in a long-lived render process
+
+    the export jobs are forked for every export and a pool of their own would
+    start its chromium processes each time. they send their figures to the
+    render process instead, its kaleido scopes start with the first export and
+    stay warm for the next ones. a job which cannot reach it renders with a
+    pool of its own"""
+
+    def __init__(self, size=4):
+        self.size = size
+        self.authkey = os.urandom(32)
+        self.manager = RendererManager(
+            authkey=self.authkey, ctx=multiprocessing.get_context("fork")
+        )
+        self.manager.start()
+        self.address = self.manager.address
+        # connected on first use, by the forked job
+        self.pid = None
+
+    def connect(self):
+        self.pid = os.getpid()
+        self.executor = ThreadPoolExecutor(self.size, thread_name_prefix="render")
+        try:
+            manager = RendererManager(address=self.address, authkey=self.authkey)
+            manager.connect()
+            self.pool = manager.pool(self.size)
+        except OSError:
+            traceback.print_exc()
+            self.pool = RendererPool(self.size)
+
+    def check_fork(self):
+        # a forked job connects again, the connections of the parent are not
+        # shared with it
+        if self.pid != os.getpid():
+            self.connect()
+
+    def render(self, figure, fmt="pdf"):
+        return self.pool.render(figure_dict(figure), fmt)
+
+    def render_many(self, jobs, progress=None):
+        """see render_many"""
+        self.check_fork()
+        return render_many(self.render, jobs, self.executor, progress)
+
+
+def safe_filename(name, default="greenboard"):
+    """strip whatever could turn a user supplied name into a path"""
+    name = re.sub(r"[^\w.-]+", "_", name or "").strip("._")
+    return name or default
+
+
+def zip_figures(named_figures, formats, pool, progress=None):
+    """zip archive (bytes) of every figure in every format,
+    named_figures maps a file stem to a figure"""
+    jobs = [
+        (f"{stem}.{fmt}", figure, fmt)
+        for stem, figure in named_figures.items()
+        for fmt in formats
+    ]
+    rendered = pool.render_many(
+        [(figure, fmt) for _, figure, fmt in jobs], progress=progress
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for (filename, _, _), content in zip(jobs, rendered):
+            archive.writestr(filename, content)
+    return buffer.getvalue()
+
+
+def alive(pid):
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+
+@contextmanager
+def job_slot(cache, limit, name="export", poll=0.5, waiting=None):
+    """hold one of the `limit` slots shared through the diskcache `cache` by
+    every process of the host, waiting(queued_for) is called while all the
+    slots are taken. a slot held by a dead process (e.g. a cancelled job) is
+    taken over"""
+    pid = os.getpid()
+    start = time.monotonic()
+    key = None
+    while key is None:
+        for slot in range(limit):
+            with cache.transact():
+                holder = cache.get(f"{name}-slot-{slot}")
+                if holder is None or not alive(holder):
+                    key = f"{name}-slot-{slot}"
+                    cache.set(key, pid)
+                    break
+        else:
+            if waiting is not None:
+                waiting(time.monotonic() - start)
+            time.sleep(poll)
+    try:
+        yield
+    finally:
+        with cache.transact():
+            if cache.get(key) == pid:
+                cache.delete(key)
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import plotly.io as pio
+
+from storage import atomic_write
+
+
+class FigureCache:
+    """bounded LRU cache of serialized figures and the state they were plotted
+    with, with a time to live
+
+    entries live in memory, or in `directory` when given so every worker of the
+    same host shares them. hits and misses are counted per process"""
+
+    def __init__(self, maxsize=128, ttl=600, directory=None, namespace=""):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.directory = directory
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, *parts):
+        """stable key of a normalized selection"""
+        blob = json.dumps([self.namespace, *parts], sort_keys=True, default=str)
+        return hashlib.sha1(blob.encode()).hexdigest()
+
+    def get(self, key):
+        blob = self._read(key)
+        with self.lock:
+            if blob is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(blob)
+
+    def set(self, key, payload):
+        """store the payload and return it unchanged"""
+        self._write(key, pio.json.to_json_plotly(payload))
+        return payload
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        for path in self._files():
+            _remove(path)
+
+    def stats(self):
+        with self.lock:
+            size = len(self._files()) if self.directory else len(self.entries)
+            return {
+                "backend": "filesystem" if self.directory else "memory",
+                "pid": os.getpid(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": size,
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+    ## memory backend
+
+    def _read(self, key):
+        if self.directory:
+            return self._read_file(key)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            created, blob = entry
+            if time.time() - created > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return blob
+
+    def _write(self, key, blob):
+        if self.directory:
+            return self._write_file(key, blob)
+        with self.lock:
+            self.entries[key] = (time.time(), blob)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    ## filesystem backend
+    # mtime is the creation time (ttl) and atime the last access (lru)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _files(self):
+        if not self.directory:
+            return []
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+
+    def _read_file(self, key):
+        path = self._path(key)
+        try:
+            created = os.stat(path).st_mtime
+            if time.time() - created > self.ttl:
+                _remove(path)
+                return None
+            with open(path) as f:
+                blob = f.read()
+            os.utime(path, (time.time(), created))
+            return blob
+        except FileNotFoundError:
+            return None
+
+    def _write_file(self, key, blob):
+        with atomic_write(self._path(key)) as tmp:
+            with open(tmp, "w") as f:
+                f.write(blob)
+        files = self._files()
+        if len(files) > self.maxsize:
+            by_access = sorted(files, key=lambda p: _stat(p).st_atime)
+            for stale in by_access[: len(files) - self.maxsize]:
+                _remove(stale)
+
+
+def _stat(path):
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return os.stat_result((0,) * 10)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
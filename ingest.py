@@ -0,0 +1,161 @@
+"""ingest the raw outputs of benchmark runs into a store read by the dashboard
+
+    python ingest.py RUNS_DIR STORE_DIR [--workers 8] [--rebuild]
+    python app.py --data-file STORE_DIR
+    python ingest.py RUNS_DIR CAMPAIGNS_DIR --campaign 2024-06-kernel-6.8
+    python app.py --campaigns CAMPAIGNS_DIR
+
+every *.csv below RUNS_DIR holds the rows of one run in the format of
+recap_frameworkbenchmark.csv, the wrk fields as printed (e.g. a debit of
+"102.07MB"). runs are parsed in a process pool and appended to STORE_DIR as
+one parquet part per ingestion, runs already listed in its manifest are
+skipped so ingesting a campaign again only parses its new runs. with
+--campaign the store is CAMPAIGNS_DIR/<campaign>, every campaign (hardware
+setup, kernel or framework upgrade...) gets its own store
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from storage import read_manifest, write_manifest, write_part
+
+# wrk prints transfer rates with binary prefixes
+UNITS = {"": 1, "B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30, "TB": 1 << 40}
+# socket errors and non 2xx responses, wrk only prints them when they happen
+ERROR_COLUMNS = ["timeout", "read", "write", "connect", "5xx"]
+TEXT_COLUMNS = [
+    "scenario",
+    "name",
+    "display_name",
+    "classification",
+    "database",
+    "language",
+    "os",
+    "framework",
+    "webserver",
+    "orm",
+    "platform",
+    "approach",
+    "status",
+]
+# run files parsed by a worker at once, one file holds a few rows
+BATCH = 64
+
+
+def parse_throughput(values):
+    """bytes/s of transfer rates like "102.07MB", plain numbers are bytes/s"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    parts = values.astype("string").str.extract(r"^\s*([-+.\deE]+)\s*([KMGT]?B)?\s*$")
+    scale = parts[1].fillna("").map(UNITS).astype("float64")
+    return pd.to_numeric(parts[0], errors="coerce") * scale
+
+
+def parse_fields(data):
+    """typed columns of the raw fields of the runs, the debit in bytes/s and
+    the error counters as numbers (0 when wrk reported none)
+
+    every other column is float64 whatever the values of the batch, the parts
+    of a store written by different ingestions share one schema"""
+    data = data.copy()
+    if "debit" in data:
+        data["debit"] = parse_throughput(data["debit"])
+    for col in ERROR_COLUMNS:
+        if col in data:
+            data[col] = pd.to_numeric(data[col], errors="coerce").fillna(0)
+    for col in data.columns:
+        if col in TEXT_COLUMNS:
+            data[col] = data[col].astype("string")
+        else:
+            data[col] = pd.to_numeric(data[col], errors="coerce").astype("float64")
+    return data
+
+
+def parse_runs(paths):
+    """rows of a batch of run files"""
+    # the text columns and the printed debit stay strings whatever the run
+    # holds, so the tables of the batch share their schema
+    options = pacsv.ConvertOptions(
+        column_types=dict.fromkeys([*TEXT_COLUMNS, "debit"], pa.string()),
+        strings_can_be_null=True,
+    )
+    tables = [pacsv.read_csv(path, convert_options=options) for path in paths]
+    data = pa.concat_tables(tables, promote_options="permissive").to_pandas()
+    return parse_fields(data)
+
+
+def find_runs(directory):
+    """relative path -> (size, mtime) of the run files below directory"""
+    runs = {}
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith(".csv"):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                runs[os.path.relpath(path, directory)] = [
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                ]
+    return runs
+
+
+def ingest(runs_dir, store, workers=None, rebuild=False):
+    """append the runs of runs_dir missing from the store, return their paths"""
+    if rebuild and os.path.isdir(store):
+        shutil.rmtree(store)
+    os.makedirs(store, exist_ok=True)
+    manifest = read_manifest(store)
+    found = find_runs(runs_dir)
+    changed = [
+        run
+        for run, stat in found.items()
+        if run in manifest["runs"] and manifest["runs"][run]["stat"] != stat
+    ]
+    if changed:
+        print(
+            f"{len(changed)} ingested runs changed since (e.g. {changed[0]}), "
+            "they are kept as ingested, use --rebuild to parse them again",
+            file=sys.stderr,
+        )
+    new = sorted(run for run in found if run not in manifest["runs"])
+    if not new:
+        return []
+
+    paths = [os.path.join(runs_dir, run) for run in new]
+    batches = [paths[i : i + BATCH] for i in range(0, len(paths), BATCH)]
+    with ProcessPoolExecutor(workers) as pool:
+        frames = list(pool.map(parse_runs, batches))
+    stamp = time.strftime("%Y%m%d%H%M%S")
+    part = f"part-{len(manifest['parts']):05d}-{stamp}.parquet"
+    write_part(pd.concat(frames, ignore_index=True), store, part)
+
+    manifest["parts"].append(part)
+    for run in new:
+        manifest["runs"][run] = {"stat": found[run], "part": part}
+    write_manifest(store, manifest)
+    return new
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("runs", help="directory of the run outputs")
+    parser.add_argument("store", help="directory of the store, created if needed")
+    parser.add_argument(
+        "--campaign", help="ingest into the store of this campaign inside STORE_DIR"
+    )
+    parser.add_argument("--workers", type=int, help="parsing processes")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="drop the store and ingest every run"
+    )
+    args = parser.parse_args()
+    start = time.perf_counter()
+    store = os.path.join(args.store, args.campaign) if args.campaign else args.store
+    new = ingest(args.runs, store, args.workers, args.rebuild)
+    print(f"{len(new)} new runs ingested in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,242 @@
+import cProfile
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from dash_extensions.enrich import DashTransform
+from flask import g, has_request_context
+
+try:
+    import pyinstrument
+except ImportError:  # optional, cProfile is used instead
+    pyinstrument = None
+
+# seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# bytes
+SIZE_BUCKETS = (1 << 10, 1 << 12, 1 << 14, 1 << 16, 1 << 18, 1 << 20, 1 << 22, 1 << 24)
+
+# time spent in each phase (data, figure...) of the running callback
+current_phases = ContextVar("current_phases", default=None)
+
+
+@contextmanager
+def phase(name):
+    """count the time of the block in the given phase of the running callback"""
+    phases = current_phases.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if phases is not None:
+            phases[name] = phases.get(name, 0) + time.perf_counter() - start
+
+
+def timed(name):
+    """decorator counting the time of the function in a phase, see phase"""
+
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return f(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class Histogram:
+    """prometheus histogram, one series per combination of labels"""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        # labels -> (count per bucket, sum, count)
+        self.series = {}
+
+    def observe(self, labels, value):
+        empty = ([0] * len(self.buckets), 0, 0)
+        counts, total, count = self.series.get(labels, empty)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self.series[labels] = (counts, total + value, count + 1)
+
+    def expose(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            base = ",".join(f'{key}="{value}"' for key, value in labels)
+            for bound, bucket_count in zip(self.buckets, counts):
+                bucket = f'{self.name}_bucket{{{base},le="{bound}"}}'
+                lines.append(f"{bucket} {bucket_count}")
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {count}")
+        return "\n".join(lines)
+
+
+class CallbackMetrics:
+    """latency and payload histograms of the callbacks of this process
+
+    background callbacks run in job processes, their observations go through
+    the shared diskcache given to share() and are collected on exposition"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.store = None
+        self.lock = threading.Lock()
+        self.histograms = {
+            "duration": Histogram(
+                "greenboard_callback_duration_seconds",
+                "wall time of the callbacks, total and per phase",
+                DURATION_BUCKETS,
+            ),
+            "size": Histogram(
+                "greenboard_callback_response_bytes",
+                "size of the serialized callback responses",
+                SIZE_BUCKETS,
+            ),
+        }
+
+    def share(self, store):
+        self.store = store
+
+    def observe(self, histogram, labels, value):
+        labels = tuple(sorted(labels.items()))
+        if self.store is not None and os.getpid() != self.pid:
+            self.store.push((histogram, labels, value), prefix="metrics")
+            return
+        with self.lock:
+            self.histograms[histogram].observe(labels, value)
+
+    def observe_callback(self, callback, total, phases):
+        self.observe("duration", {"callback": callback, "phase": "total"}, total)
+        for name, seconds in phases.items():
+            self.observe("duration", {"callback": callback, "phase": name}, seconds)
+
+    def collect(self):
+        """observations pushed by the job processes"""
+        if self.store is None:
+            return
+        while True:
+            key, observation = self.store.pull(prefix="metrics")
+            if key is None:
+                return
+            histogram, labels, value = observation
+            with self.lock:
+                self.histograms[histogram].observe(labels, value)
+
+    def expose(self):
+        """prometheus text format"""
+        self.collect()
+        with self.lock:
+            return "\n".join(h.expose() for h in self.histograms.values()) + "\n"
+
+
+class Profiler:
+    """profile of the next callback once armed, written to directory
+
+    pyinstrument (html) when installed, cProfile (pstats) otherwise"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.armed = False
+        self.last = None
+        self.lock = threading.Lock()
+
+    def arm(self):
+        with self.lock:
+            self.armed = True
+
+    def start(self):
+        with self.lock:
+            if not self.armed:
+                return None
+            self.armed = False
+        profiler = pyinstrument.Profiler() if pyinstrument else cProfile.Profile()
+        if pyinstrument:
+            profiler.start()
+        else:
+            profiler.enable()
+        return profiler
+
+    def stop(self, profiler, callback):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        stem = os.path.join(self.directory, f"{callback}-{stamp}")
+        if pyinstrument:
+            profiler.stop()
+            path = f"{stem}.html"
+            with open(path, "w") as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            path = f"{stem}.prof"
+            profiler.dump_stats(path)
+        self.last = path
+        return path
+
+
+class CallbackMetricsTransform(DashTransform):
+    """time every server side callback, the phases it declares (see phase)
+    and profile it when the profiler is armed"""
+
+    def __init__(self, metrics, profiler=None):
+        super().__init__()
+        self.metrics = metrics
+        self.profiler = profiler
+
+    def apply(self, callbacks, clientside_callbacks):
+        return self.apply_serverside(callbacks), clientside_callbacks
+
+    def apply_serverside(self, callbacks):
+        for callback in callbacks:
+            callback.f = self.instrument(callback.f)
+        return callbacks
+
+    def instrument(self, f):
+        name = f.__name__
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            phases = {}
+            token = current_phases.set(phases)
+            profiler = self.profiler.start() if self.profiler else None
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                total = time.perf_counter() - start
+                if profiler is not None:
+                    self.profiler.stop(profiler, name)
+                current_phases.reset(token)
+                self.metrics.observe_callback(name, total, phases)
+                set_request_callback(name)
+
+        return wrapper
+
+    def sort_key(self):
+        # outermost, after the other transforms wrapped the callbacks
+        return 2
+
+
+def set_request_callback(name):
+    """remember which callback the current request ran, see observe_response"""
+    if has_request_context():
+        g.greenboard_callback = name
+
+
+def observe_response(metrics, response):
+    """flask after_request hook recording the size of callback responses"""
+    callback = g.pop("greenboard_callback", None)
+    if callback is not None and not response.direct_passthrough:
+        metrics.observe("size", {"callback": callback}, len(response.get_data()))
+    return response
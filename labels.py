@@ -40,6 +40,17 @@ dram_metrics = [
     "av_dram_per_request",
 ]
 
+efficiency_metrics = (
+    ["latencyAvg", "totalRequests", "RPS", "latency99"] + cpu_metrics + dram_metrics
+)
+efficiency_labels = {
+    "value": "Ratio to the framework maximum",
+    "variable": "Metric",
+    "eff_RPS": "Throughput",
+    "eff_av_cpu_per_request": "Energy per request",
+    "eff_av_dram_per_request": "Energy per request",
+}
+
 
 index = ["type", "name", "level"]
 
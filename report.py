@@ -0,0 +1,188 @@
+"""render the figures of the dashboard for every scenario, energy scope and
+group of languages, without a browser
+
+    python report.py REPORT_DIR [--formats pdf png] [--workers 4]
+    python report.py report.zip --group jvm=java,kotlin,scala --group go=go
+    GREENBOARD_DATA_FILE=store/ python report.py REPORT_DIR
+
+the dataset is opened once, by importing app with the same GREENBOARD_*
+variables as the dashboard, then the workers are forked from this process and
+share it. every worker builds the figures of a (scenario, language group,
+scope) with line_figures, idle_power_plot and efficiency_plot, renders them
+with its own kaleido processes, started before the first job, and sends the
+files back. they are written to REPORT_DIR/<scenario>/<group>/[<scope>/] or
+to a zip archive when the output ends with .zip. without --group every
+language is a group
+"""
+import argparse
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import app
+from duckdb_dataset import DuckDBDataset
+from export import EXPORT_FORMATS, RendererPool, safe_filename
+
+# the throughput and latency do not depend on the energy scope, their job has
+# no scope and writes at the root of the group
+PERFORMANCE = None
+SCOPES = ["cpu", "dram"]
+
+# kaleido processes of the worker, see start_worker
+renderer_pool = None
+
+
+def start_worker(size):
+    """runs once in every worker, before its first job"""
+    global renderer_pool
+    # a duckdb connection is not shared with a forked process
+    if isinstance(app.dataset, DuckDBDataset):
+        app.dataset = DuckDBDataset(app.dataset.directory)
+    renderer_pool = RendererPool(size)
+    renderer_pool.warm_up()
+
+
+def report_figures(scenario, names, scope):
+    """file stem -> figure, the same the Download button of the dashboard
+    exports for this selection (its scope-free figures in the PERFORMANCE job)"""
+    if scope is PERFORMANCE:
+        metrics = ["RPS", "latencyAvg"]
+        data = app.summary_view(names, scenario, [], metrics)
+        figures = app.line_figures(data, scenario, metrics)
+        return {f"line_plot_{m}": fig for m, fig in zip(metrics, figures)}
+    metrics = [f"av_{scope}_per_request", f"av_power_{scope}"]
+    data = app.summary_view(names, scenario, [], metrics)
+    figures = app.line_figures(data, scenario, metrics)
+    named_figures = {f"line_plot_{m}": fig for m, fig in zip(metrics, figures)}
+    idle = app.dataset.idle(names).fillna(0)
+    named_figures["idle_power"] = app.idle_power_plot(idle, scope)
+    data = app.summary_view(names, scenario, [], ["RPS", f"av_{scope}_per_request"])
+    named_figures["efficiency"] = app.efficiency_plot(data, scope)
+    return named_figures
+
+
+def render_job(folder, scenario, names, scope, formats):
+    """(path in the report, content) of every figure of a job"""
+    named_figures = report_figures(scenario, names, scope)
+    jobs = [
+        (os.path.join(folder, f"{stem}.{fmt}"), figure, fmt)
+        for stem, figure in named_figures.items()
+        for fmt in formats
+    ]
+    rendered = renderer_pool.render_many([(figure, fmt) for _, figure, fmt in jobs])
+    return [(path, content) for (path, _, _), content in zip(jobs, rendered)]
+
+
+def language_groups(groups):
+    """group name -> languages, one group per language without --group"""
+    if not groups:
+        return {
+            safe_filename(option["value"]): [option["value"]]
+            for option in app.languages
+        }
+    return {
+        safe_filename(name): languages.split(",")
+        for name, _, languages in (group.partition("=") for group in groups)
+    }
+
+
+def report_jobs(scenarios, groups, scopes, formats):
+    """arguments of render_job for every selection with frameworks"""
+    jobs = []
+    for scenario in scenarios:
+        for group, languages in groups.items():
+            catalogue = app.dataset.catalogue(scenario, languages)
+            names = sorted(catalogue["name"].astype(str).unique())
+            if not names:
+                continue
+            folder = os.path.join(scenario, group)
+            jobs.append((folder, scenario, names, PERFORMANCE, formats))
+            for scope in scopes:
+                folder = os.path.join(scenario, group, scope)
+                jobs.append((folder, scenario, names, scope, formats))
+    return jobs
+
+
+class ReportWriter:
+    """files of the report in a directory tree or a zip archive"""
+
+    def __init__(self, output):
+        self.output = output
+        self.archive = None
+        if output.endswith(".zip"):
+            self.archive = zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED)
+
+    def write(self, path, content):
+        if self.archive is not None:
+            self.archive.writestr(path, content)
+            return
+        path = os.path.join(self.output, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+
+def report(output, scenarios, groups, scopes, formats, workers=None, renderers=1):
+    """render every figure of the report, return the number of files"""
+    jobs = report_jobs(scenarios, language_groups(groups), scopes, formats)
+    writer = ReportWriter(output)
+    written = 0
+    # forked, the workers share the dataset opened by this process
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=start_worker,
+        initargs=(renderers,),
+    ) as pool:
+        futures = [pool.submit(render_job, *job) for job in jobs]
+        try:
+            for future in as_completed(futures):
+                for path, content in future.result():
+                    writer.write(path, content)
+                    written += 1
+        finally:
+            writer.close()
+    return written
+
+
+if __name__ == "__main__":
+    scenarios = [option["value"] for option in app.scenarios.options]
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="directory of the report, or a .zip archive")
+    parser.add_argument(
+        "--formats", nargs="+", choices=list(EXPORT_FORMATS), default=["pdf"]
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=scenarios, default=scenarios)
+    parser.add_argument("--scopes", nargs="+", choices=SCOPES, default=SCOPES)
+    parser.add_argument(
+        "--group",
+        action="append",
+        metavar="NAME=LANGUAGE,...",
+        help="frameworks of these languages plotted together, can be repeated",
+    )
+    parser.add_argument("--workers", type=int, help="rendering processes")
+    parser.add_argument(
+        "--renderers", type=int, default=1, help="kaleido processes per worker"
+    )
+    args = parser.parse_args()
+    known = {option["value"] for option in app.languages}
+    for group in language_groups(args.group).values():
+        if unknown := set(group) - known:
+            parser.error(f"unknown languages {', '.join(sorted(unknown))}")
+    start = time.perf_counter()
+    written = report(
+        args.output,
+        args.scenarios,
+        args.group,
+        args.scopes,
+        args.formats,
+        args.workers,
+        args.renderers,
+    )
+    print(f"{written} files written in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,208 @@
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+CACHE_DIR = ".cache"
+# bump when the derived columns computed by load_data/clean_data change
+CACHE_VERSION = 6
+# lists the ingested runs and the parquet parts of a store, see ingest.py
+MANIFEST = "manifest.json"
+
+
+def file_digest(filename, chunk_size=1 << 20):
+    """sha256 of the content of the file"""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_file(filename):
+    """file identifying the content of the data source, the manifest of a store"""
+    return os.path.join(filename, MANIFEST) if os.path.isdir(filename) else filename
+
+
+def cache_base(filename):
+    """prefix of the caches of a source, its name (without the extension of a
+    file, a store like kernel-6.8 keeps its dots) and a hash of its absolute
+    path, so sources of the same name in other directories do not share it"""
+    name = os.path.basename(os.path.normpath(filename))
+    if not os.path.isdir(filename):
+        name = os.path.splitext(name)[0]
+    location = hashlib.sha256(os.path.abspath(filename).encode()).hexdigest()
+    return f"{name}-{location[:8]}"
+
+
+def cache_path(filename, cache_dir=CACHE_DIR, suffix=".arrow"):
+    """path of the cached frame for the current content of filename
+
+    the key combines the content hash, the mtime and CACHE_VERSION
+    so editing or replacing the csv (or ingesting runs in the store)
+    invalidates the cache"""
+    source = source_file(filename)
+    stat = os.stat(source)
+    key = f"{file_digest(source)[:16]}-{stat.st_mtime_ns}-v{CACHE_VERSION}"
+    return os.path.join(cache_dir, f"{cache_base(filename)}.{key}{suffix}")
+
+
+@contextmanager
+def atomic_write(path):
+    """temporary path to write a file (or directory) to, moved to path when the
+    block succeeds so readers never see it half written. the temporary name is
+    unique per process and thread, concurrent writers of path never share it"""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield tmp
+        if os.path.isdir(tmp):
+            shutil.rmtree(path, ignore_errors=True)
+            os.rename(tmp, path)
+        else:
+            os.replace(tmp, path)
+    finally:
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+        elif os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def arrow_table(data):
+    """arrow table of the frame where NaN stay float values instead of
+    becoming nulls, so float columns can be read back without a copy"""
+    table = pa.Table.from_pandas(data, preserve_index=True)
+    for name in data.select_dtypes("float").columns:
+        i = table.schema.get_field_index(name)
+        values = pa.array(data[name].to_numpy(), from_pandas=False)
+        table = table.set_column(i, table.schema.field(i), values)
+    return table
+
+
+def write_frame(data, path):
+    """write the frame as an uncompressed arrow ipc (feather v2) file
+    so it can be memory mapped when read back"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # atomic so concurrent workers never read a half written file
+    with atomic_write(path) as tmp:
+        feather.write_feather(arrow_table(data), tmp, compression="uncompressed")
+
+
+def read_frame(path, zero_copy=False):
+    """read a frame written by write_frame
+
+    with zero_copy the numeric columns are read-only views on the memory
+    mapped file, every process attached to the same file shares their pages"""
+    table = feather.read_table(path, memory_map=True)
+    if zero_copy:
+        return keep_blocks(table.to_pandas(split_blocks=True))
+    return table.to_pandas()
+
+
+def keep_blocks(data):
+    """stop pandas from consolidating the blocks of the frame in place
+
+    most indexing operations consolidate their source first, which would
+    copy every column attached without copy into private memory"""
+    # private attributes of the block manager, checked against the pandas
+    # versions allowed by the Pipfile, see test_storage
+    data._mgr._known_consolidated = True
+    data._mgr._is_consolidated = True
+    return data
+
+
+## run store
+# a directory of parquet parts appended by ingest.py and the manifest of the
+# runs they hold
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"runs": {}, "parts": []}
+
+
+def write_manifest(directory, manifest):
+    # readers only see the parts listed by a complete manifest
+    with atomic_write(os.path.join(directory, MANIFEST)) as tmp:
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+def write_part(data, directory, name):
+    with atomic_write(os.path.join(directory, name)) as tmp:
+        pq.write_table(pa.Table.from_pandas(data, preserve_index=False), tmp)
+
+
+def read_parts(directory, parts):
+    tables = [pq.read_table(os.path.join(directory, part)) for part in parts]
+    # parts written before the columns were all float64 may disagree on them
+    return pa.concat_tables(tables, promote_options="permissive").to_pandas()
+
+
+def read_store(directory):
+    """rows of every part listed by the manifest of the store"""
+    parts = read_manifest(directory)["parts"]
+    if not parts:
+        raise FileNotFoundError(f"no ingested runs in {directory}")
+    return read_parts(directory, parts)
+
+
+@contextmanager
+def file_lock(path):
+    """exclusive lock shared by every process of the host"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def purge_stale(path):
+    """remove the caches of older versions of the same source file"""
+    base, _, suffix = os.path.basename(path).rsplit(".", 2)
+    pattern = f"{glob.escape(base)}.*.{suffix}"
+    for stale in glob.glob(os.path.join(os.path.dirname(path), pattern)):
+        # the base of another source may start with this one and a dot
+        if stale != path and os.path.basename(stale).rsplit(".", 2)[0] == base:
+            shutil.rmtree(stale) if os.path.isdir(stale) else os.remove(stale)
+
+
+def cached_frame(
+    filename, build, rebuild=False, cache_dir=CACHE_DIR, zero_copy=False
+):
+    """return build(filename), reading it from the columnar cache when the
+    source file did not change since the cache was written, and the path of
+    the cache, which changes with the content of the source
+
+    workers starting together wait for the first one to build the cache
+    instead of all parsing the source"""
+    path = cache_path(filename, cache_dir)
+    with file_lock(os.path.join(cache_dir, f"{cache_base(filename)}.lock")):
+        if rebuild or not os.path.exists(path):
+            write_frame(build(filename), path)
+            purge_stale(path)
+    return read_frame(path, zero_copy), path
+
+
+def cached_directory(filename, build, write, rebuild=False, cache_dir=CACHE_DIR):
+    """directory where write(build(filename), directory) wrote the source,
+    written again only when the source file changed, see cached_frame"""
+    path = cache_path(filename, cache_dir, suffix=".parquet")
+    with file_lock(os.path.join(cache_dir, f"{cache_base(filename)}.lock")):
+        if rebuild or not os.path.exists(path):
+            with atomic_write(path) as tmp:
+                write(build(filename), tmp)
+            purge_stale(path)
+    return path
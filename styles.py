@@ -1,6 +1,8 @@
 import itertools
+from functools import lru_cache
 
 import matplotlib as mpl
+import numpy as np
 
 plot_config = {
     "toImageButtonOptions": {
@@ -69,138 +71,259 @@ def choose_frontcolor(background):
     )
 
 
-def databar_heatmap(df, column="av_power_cpu", colormap="RdYlGn_r", log_scale=False):
+# size of the colormap lookup table used by the precomputed styles
+LUT_SIZE = 256
+# upper bound of the filter_query rules emitted for one column
+MAX_RULES = 32
+BAR_COLOR = "#0074D9"
 
-    backgroundcolors = mpl.cm.get_cmap(colormap)
-    values = df[column]
 
+@lru_cache(maxsize=None)
+def colormap_lut(colormap="RdYlGn_r", size=LUT_SIZE):
+    """background and text colors of `size` evenly spaced points of the colormap"""
+    rgba = mpl.colormaps[colormap](np.linspace(0, 1, size))
+    backgrounds = np.array([mpl.colors.to_hex(color) for color in rgba])
+    fronts = np.array([choose_frontcolor(color) for color in rgba])
+    return backgrounds, fronts
+
+
+def transformed(values, log_scale=False):
+    """float copy of the values, infinite values are missing like nan"""
+    values = np.array(values, dtype="float64")
     if log_scale:
-        values = [math.log(x) if x > 0 else x for x in values]
-    data_values = dict(zip(values, df[column]))
+        np.log(values, out=values, where=values > 0)
+    values[np.isinf(values)] = np.nan
+    return values
 
-    df_max = max(values)
-    df_min = min(values)
-    styles = []
-    legend = []
-    for value in values:
-        ratio = (
-            (value - df_min) / (df_max - df_min)
-            if df_max - df_min > 0
-            else (value - df_min)
-        )
-        background = backgroundcolors(ratio)
-        frontcolor = choose_frontcolor(background)
-        styles.append(
-            {
-                "if": {
-                    "filter_query": "{{{}}} = {}".format(column, data_values[value]),
-                    "column_id": column,
-                },
-                "backgroundColor": mpl.colors.to_hex(background),
-                "color": frontcolor,
-            }
+
+def value_range(values, log_scale=False, vmin=None, vmax=None):
+    """bounds of the scale of the transformed values"""
+    low = np.nanmin(values) if vmin is None else transformed([vmin], log_scale)[0]
+    high = np.nanmax(values) if vmax is None else transformed([vmax], log_scale)[0]
+    return low, high
+
+
+def scaled(values, log_scale=False, vmin=None, vmax=None):
+    """position of every value in the [vmin, vmax] range, between 0 and 1,
+    nan for missing values"""
+    values = transformed(values, log_scale)
+    if np.isnan(values).all():
+        return values
+    low, high = value_range(values, log_scale, vmin, vmax)
+    if high - low > 0:
+        return np.clip((values - low) / (high - low), 0, 1)
+    return np.where(np.isnan(values), np.nan, 0.0)
+
+
+def buckets(values, n_buckets, log_scale=False, vmin=None, vmax=None):
+    """index of the bucket (out of n_buckets) of every value, -1 for missing
+    values"""
+    ratios = scaled(values, log_scale, vmin, vmax)
+    present = ~np.isnan(ratios)
+    bucket_of = np.full(len(ratios), -1)
+    bucket_of[present] = np.rint(ratios[present] * (n_buckets - 1))
+    return bucket_of
+
+
+def range_rules(values, column, n_buckets, log_scale=False, vmin=None, vmax=None):
+    """one (bucket, filter_query) pair per populated bucket
+
+    colors and bars are monotonic in the value, so a bucket is the range of
+    values between its edges and the rules only need the populated buckets,
+    not the rows. the lowest and highest populated buckets are closed by the
+    smallest and largest values, they also hold the values clipped to vmin
+    and vmax. missing values get no rule"""
+    bucket_of = buckets(values, n_buckets, log_scale, vmin, vmax)
+    present = bucket_of >= 0
+    if not present.any():
+        return []
+    used = np.flatnonzero(np.bincount(bucket_of[present], minlength=n_buckets))
+    low, high = value_range(transformed(values, log_scale), log_scale, vmin, vmax)
+    edges = low + (np.arange(n_buckets + 1) - 0.5) * (high - low) / (n_buckets - 1)
+    if log_scale:
+        edges = np.exp(edges)
+    raw = np.array(values, dtype="float64")[present]
+    edges[used[0]] = raw.min()
+    edges[used[-1] + 1] = raw.max()
+    return [
+        (
+            bucket,
+            "{{{column}}} >= {low} && {{{column}}} {op} {high}".format(
+                column=column,
+                low=float(edges[bucket]),
+                op="<=" if bucket == used[-1] else "<",
+                high=float(edges[bucket + 1]),
+            ),
         )
-    return styles
+        for bucket in used
+    ]
 
 
-def data_bars(df, column):
-    n_bins = 100
-    bounds = [i * (1.0 / n_bins) for i in range(n_bins + 1)]
-    ranges = [
-        ((df[column].max() - df[column].min()) * i) + df[column].min() for i in bounds
+def databar_heatmap(
+    df,
+    column="av_power_cpu",
+    colormap="RdYlGn_r",
+    log_scale=False,
+    vmin=None,
+    vmax=None,
+    max_rules=MAX_RULES,
+):
+    """heatmap background of the column as filter_query rules
+    values sharing a color share a rule, so there are at most max_rules
+    rules whatever the number of rows. vmin and vmax default to the range
+    of the column"""
+    if len(df) == 0:
+        return []
+    backgrounds, fronts = colormap_lut(colormap, max_rules)
+    rules = range_rules(df[column], column, max_rules, log_scale, vmin, vmax)
+    return [
+        {
+            "if": {"filter_query": query, "column_id": column},
+            "backgroundColor": backgrounds[bucket],
+            "color": fronts[bucket],
+        }
+        for bucket, query in rules
     ]
-    styles = []
-    for i in range(1, len(bounds)):
-        min_bound = ranges[i - 1]
-        max_bound = ranges[i]
-        max_bound_percentage = bounds[i] * 100
-        styles.append(
-            {
-                "if": {
-                    "filter_query": (
-                        "{{{column}}} >= {min_bound}"
-                        + (
-                            " && {{{column}}} < {max_bound}"
-                            if (i < len(bounds) - 1)
-                            else ""
-                        )
-                    ).format(column=column, min_bound=min_bound, max_bound=max_bound),
-                    "column_id": column,
-                },
-                "background": (
-                    """
+
+
+def bar_background(width, color=BAR_COLOR):
+    return """
                     linear-gradient(90deg,
-                    #0074D9 0%,
-                    #0074D9 {max_bound_percentage}%,
-                    white {max_bound_percentage}%,
+                    {color} 0%,
+                    {color} {width}%,
+                    white {width}%,
                     white 100%)
                 """.format(
-                        max_bound_percentage=max_bound_percentage
-                    )
-                ),
-                "paddingBottom": 2,
-                "paddingTop": 2,
-            }
-        )
-
-    return styles
-
+        color=color, width=width
+    )
 
-def data_bars_diverging(df, column, color_above="#3D9970", color_below="#FF4136"):
-    n_bins = 100
-    bounds = [i * (1.0 / n_bins) for i in range(n_bins + 1)]
-    col_max = df[column].max()
-    col_min = df[column].min()
-    ranges = [((col_max - col_min) * i) + col_min for i in bounds]
-    midpoint = (col_max + col_min) / 2.0
 
-    styles = []
-    for i in range(1, len(bounds)):
-        min_bound = ranges[i - 1]
-        max_bound = ranges[i]
-        min_bound_percentage = bounds[i - 1] * 100
-        max_bound_percentage = bounds[i] * 100
-
-        style = {
-            "if": {
-                "filter_query": (
-                    "{{{column}}} >= {min_bound}"
-                    + (
-                        " && {{{column}}} < {max_bound}"
-                        if (i < len(bounds) - 1)
-                        else ""
-                    )
-                ).format(column=column, min_bound=min_bound, max_bound=max_bound),
-                "column_id": column,
-            },
+def data_bars(df, column, vmin=None, vmax=None, n_bins=MAX_RULES):
+    """horizontal bar proportional to the value, one rule per populated bin"""
+    if len(df) == 0:
+        return []
+    rules = range_rules(df[column], column, n_bins, vmin=vmin, vmax=vmax)
+    return [
+        {
+            "if": {"filter_query": query, "column_id": column},
+            "background": bar_background(round(bucket * 100 / (n_bins - 1), 1)),
             "paddingBottom": 2,
             "paddingTop": 2,
         }
-        if max_bound > midpoint:
+        for bucket, query in rules
+    ]
+
+
+def data_bars_diverging(
+    df, column, color_above="#3D9970", color_below="#FF4136", n_bins=MAX_RULES
+):
+    """bar growing right from the middle of the cell above the midpoint of the
+    column and left below it, one rule per populated bin"""
+    if len(df) == 0:
+        return []
+    styles = []
+    for bucket, query in range_rules(df[column], column, n_bins):
+        percentage = round(bucket * 100 / (n_bins - 1), 1)
+        if percentage > 50:
             background = """
                     linear-gradient(90deg,
                     white 0%,
                     white 50%,
                     {color_above} 50%,
-                    {color_above} {max_bound_percentage}%,
-                    white {max_bound_percentage}%,
+                    {color_above} {percentage}%,
+                    white {percentage}%,
                     white 100%)
                 """.format(
-                max_bound_percentage=max_bound_percentage, color_above=color_above
+                percentage=percentage, color_above=color_above
             )
         else:
             background = """
                     linear-gradient(90deg,
                     white 0%,
-                    white {min_bound_percentage}%,
-                    {color_below} {min_bound_percentage}%,
+                    white {percentage}%,
+                    {color_below} {percentage}%,
                     {color_below} 50%,
                     white 50%,
                     white 100%)
                 """.format(
-                min_bound_percentage=min_bound_percentage, color_below=color_below
+                percentage=percentage, color_below=color_below
             )
-        style["background"] = background
-        styles.append(style)
+        styles.append(
+            {
+                "if": {"filter_query": query, "column_id": column},
+                "background": background,
+                "paddingBottom": 2,
+                "paddingTop": 2,
+            }
+        )
+    return styles
 
+
+def change_styles(higher_better, lower_better, good="#3D9970", bad="#FF4136"):
+    """text color of relative changes, green when the metric improved"""
+    styles = []
+    for columns, improved in [(higher_better, ">"), (lower_better, "<")]:
+        for column in columns:
+            worse = "<" if improved == ">" else ">"
+            for op, color in [(improved, good), (worse, bad)]:
+                query = f"{{{column}}} {op} 0"
+                styles.append(
+                    {
+                        "if": {"filter_query": query, "column_id": column},
+                        "color": color,
+                        "fontWeight": "bold",
+                    }
+                )
     return styles
+
+
+##BLOCK precomputed styles
+# instead of filter queries evaluated by the browser against every cell,
+# the colors and bar widths of the displayed rows are computed on the server
+# and addressed by row index
+
+
+def heatmap_colors(
+    values, colormap="RdYlGn_r", log_scale=False, vmin=None, vmax=None
+):
+    """background and text color of every value, in one numpy pass, None for
+    missing values"""
+    backgrounds, fronts = colormap_lut(colormap)
+    bucket_of = buckets(values, LUT_SIZE, log_scale, vmin, vmax)
+    present = bucket_of >= 0
+    return (
+        np.where(present, backgrounds[bucket_of], None),
+        np.where(present, fronts[bucket_of], None),
+    )
+
+
+def bar_widths(values, vmin=None, vmax=None):
+    """bar length of every value, in percent of the [vmin, vmax] range, nan
+    for missing values"""
+    return np.round(scaled(values, vmin=vmin, vmax=vmax) * 100, 1)
+
+
+def heatmap_row_styles(df, column, **kwargs):
+    backgrounds, fronts = heatmap_colors(df[column], **kwargs)
+    return [
+        {
+            "if": {"row_index": i, "column_id": column},
+            "backgroundColor": background,
+            "color": front,
+        }
+        for i, (background, front) in enumerate(zip(backgrounds, fronts))
+        if background is not None
+    ]
+
+
+def bar_row_styles(df, column, vmin=None, vmax=None):
+    return [
+        {
+            "if": {"row_index": i, "column_id": column},
+            "background": bar_background(width),
+            "paddingBottom": 2,
+            "paddingTop": 2,
+        }
+        for i, width in enumerate(bar_widths(df[column], vmin, vmax))
+        if not np.isnan(width)
+    ]
@@ -0,0 +1,100 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import BitmapIndex, Dataset, filter_columns
+from labels import categories, efficiency_metrics
+
+SCENARIOS = ["db", "json", "query"]
+LEVELS = [16, 32, 64]
+
+
+def catalogue(size, seed=0):
+    """frameworks with random values of the filtered columns"""
+    rng = np.random.default_rng(seed)
+    values = {col: [f"{col}-{i}" for i in range(4)] for col in filter_columns}
+    return pd.DataFrame({col: rng.choice(values[col], size) for col in filter_columns})
+
+
+def runs(names, seed=0):
+    """two runs per (scenario, name, level), with the columns of the cleaned
+    dataset read by Dataset"""
+    rng = np.random.default_rng(seed)
+    keys = list(itertools.product(SCENARIOS, names, LEVELS, range(2)))
+    data = pd.DataFrame(keys, columns=["scenario", "name", "level", "run"])
+    data["display_name"] = data["name"].str.upper()
+    data["language"] = data["name"].str.split("-").str[0]
+    for col in categories:
+        data[col] = data["name"].map(lambda name: f"{col}-{len(name) % 3}")
+    for metric in efficiency_metrics:
+        data[metric] = rng.random(len(data))
+        data[f"eff_{metric}"] = rng.random(len(data))
+    text = ["scenario", "name", "display_name", "language"] + categories
+    return data.drop(columns="run").astype(dict.fromkeys(text, "category"))
+
+
+def normalized(data):
+    data = data.astype({col: object for col in data.select_dtypes("category")})
+    return data.sort_values(list(data.columns), kind="stable").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bitmap_index_matches_isin(seed):
+    data = catalogue(200, seed)
+    bitmaps = BitmapIndex(data, filter_columns)
+    rng = np.random.default_rng(seed)
+    filters = {
+        col: list(rng.choice(data[col].unique(), rng.integers(0, 3), replace=False))
+        for col in rng.choice(filter_columns, 3, replace=False)
+    }
+    # a value missing from the column matches nothing
+    filters["language"] = filters.get("language", []) + ["unknown"]
+
+    mask = np.ones(len(data), dtype=bool)
+    for col, values in filters.items():
+        mask &= data[col].isin(values).to_numpy()
+    rows = bitmaps.rows(bitmaps.query(filters))
+    assert rows.tolist() == np.flatnonzero(mask).tolist()
+
+    facets = bitmaps.facets(filters, categories)
+    for col in categories:
+        others = np.ones(len(data), dtype=bool)
+        for c, values in filters.items():
+            if c != col:
+                others &= data[c].isin(values).to_numpy()
+        expected = data.loc[others, col].value_counts().to_dict()
+        assert {k: v for k, v in facets[col].items() if v} == expected
+
+
+def test_update_matches_a_rebuild():
+    names = ["go-gin", "go-fiber", "rust-actix", "php-laravel", "crystal-kemal"]
+    full = runs(names)
+    # crystal-kemal is new, go-fiber gets the rows it missed
+    missing = (full["name"] == "crystal-kemal") | (
+        (full["name"] == "go-fiber") & (full["level"] == 64)
+    )
+    dataset = Dataset(full.loc[~missing].reset_index(drop=True))
+    changed = full["name"].isin(["crystal-kemal", "go-fiber"])
+    dataset.update(full.loc[changed].reset_index(drop=True), revision=7)
+    rebuilt = Dataset(full)
+
+    for attr in ["data", "summary_rows", "catalogue_rows"]:
+        updated, expected = getattr(dataset.state, attr), getattr(rebuilt.state, attr)
+        pd.testing.assert_frame_equal(
+            normalized(updated), normalized(expected[updated.columns])
+        )
+    assert dataset.state.levels == rebuilt.state.levels
+    assert dataset.revision(["go-gin", "go-fiber", "crystal-kemal"]) == [0, 7, 7]
+    for scenario in SCENARIOS:
+        pd.testing.assert_frame_equal(
+            normalized(dataset.summary(scenario, names)),
+            normalized(rebuilt.summary(scenario, names)),
+        )
+        assert normalized(dataset.catalogue(scenario, ["go", "crystal"])).equals(
+            normalized(rebuilt.catalogue(scenario, ["go", "crystal"]))
+        )
+        assert dataset.facets(scenario, ["crystal"]) == rebuilt.facets(
+            scenario, ["crystal"]
+        )
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from ingest import ingest, parse_throughput
+from storage import read_manifest, read_store
+
+
+def write_run(directory, name, rows):
+    directory.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows).to_csv(directory / f"{name}.csv", index=False)
+
+
+def run_rows(name, errors):
+    return [
+        {
+            "scenario": "db",
+            "name": name,
+            "level": level,
+            "totalRequests": 1000 * level,
+            "debit": "1.5MB",
+            "5xx": error,
+        }
+        for level, error in zip([16, 32], errors)
+    ]
+
+
+def test_parts_of_different_ingestions_are_read_together(tmp_path):
+    runs, store = tmp_path / "runs", tmp_path / "store"
+    # integral counters, then a run where wrk printed none
+    write_run(runs / "db", "a", run_rows("a", [5, 7]))
+    assert ingest(runs, store, workers=1) == ["db/a.csv"]
+    write_run(runs / "db", "b", run_rows("b", [None, None]))
+    assert ingest(runs, store, workers=1) == ["db/b.csv"]
+
+    assert len(read_manifest(store)["parts"]) == 2
+    data = read_store(store)
+    assert data["name"].tolist() == ["a", "a", "b", "b"]
+    assert data["5xx"].tolist() == [5, 7, 0, 0]
+    assert data["debit"].tolist() == [1.5 * (1 << 20)] * 4
+
+
+def test_parse_throughput():
+    values = pd.Series(["102.07MB", "1KB", "3B", "0.0", "2GB", None, " 5 MB ", "n/a"])
+    parsed = parse_throughput(values)
+    expected = [102.07 * (1 << 20), 1024, 3, 0, 2 * (1 << 30), None, 5 * (1 << 20)]
+    assert parsed.tolist()[:5] == pytest.approx(expected[:5])
+    assert parsed[[5, 7]].isna().all()
+    assert parsed[6] == 5 * (1 << 20)
+    # already parsed values are kept
+    assert parse_throughput(pd.Series([1, 2])).tolist() == [1.0, 2.0]
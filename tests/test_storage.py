@@ -0,0 +1,94 @@
+import itertools
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dataset import Dataset, sort_frame
+from labels import categories, efficiency_metrics
+from storage import atomic_write, cache_path, cached_frame, read_frame, write_frame
+
+
+def write_csv(path, value):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({"value": [value]}).to_csv(path, index=False)
+
+
+def test_sources_of_similar_names_keep_their_cache(tmp_path):
+    cache_dir = tmp_path / "cache"
+    sources = [
+        tmp_path / "campaigns" / "kernel-6.8",
+        tmp_path / "campaigns" / "kernel-6.9",
+        tmp_path / "campaigns" / "recap.csv",
+        tmp_path / "recap.csv",
+    ]
+    for i, source in enumerate(sources):
+        if source.suffix == ".csv":
+            write_csv(source, i)
+        else:
+            # a store, the manifest identifies its content
+            write_csv(source / "runs.csv", i)
+            (source / "manifest.json").write_text(f'{{"parts": [{i}]}}')
+    paths = [cache_path(source, cache_dir) for source in sources]
+    assert len(set(paths)) == len(paths)
+
+    def build(source):
+        return pd.DataFrame({"source": [str(source)]})
+
+    for source in sources:
+        cached_frame(source, build, cache_dir=cache_dir)
+    # every source kept its cache, loading one did not purge the others
+    for source, path in zip(sources, paths):
+        assert os.path.exists(path)
+        cached, cached_path = cached_frame(source, None, cache_dir=cache_dir)
+        assert cached["source"][0] == str(source)
+        assert cached_path == path
+
+
+def test_concurrent_writers_of_one_path(tmp_path):
+    path = tmp_path / "entry.json"
+    errors = []
+
+    def write(value):
+        for _ in range(100):
+            try:
+                with atomic_write(path) as tmp:
+                    with open(tmp, "w") as f:
+                        f.write(value)
+            except OSError as error:
+                errors.append(error)
+
+    threads = [threading.Thread(target=write, args=(str(i),)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert path.read_text() in {"0", "1", "2", "3"}
+    assert os.listdir(tmp_path) == ["entry.json"]
+
+
+def test_dataset_partitions_share_the_mapped_file(tmp_path):
+    rng = np.random.default_rng(0)
+    keys = itertools.product(["db", "json"], ["go-a", "rust-b"], [16, 32], range(2))
+    data = pd.DataFrame(keys, columns=["scenario", "name", "level", "run"])
+    data["display_name"] = data["name"].str.upper()
+    data["language"] = data["name"].str.split("-").str[0]
+    for col in categories:
+        data[col] = f"{col}-0"
+    for metric in efficiency_metrics:
+        data[metric] = rng.random(len(data))
+        data[f"eff_{metric}"] = rng.random(len(data))
+    text = ["scenario", "name", "display_name", "language"] + categories
+    data = data.drop(columns="run").astype(dict.fromkeys(text, "category"))
+    write_frame(sort_frame(data), tmp_path / "runs.arrow")
+
+    frame = read_frame(tmp_path / "runs.arrow", zero_copy=True)
+    mapped = {metric: frame[metric].to_numpy() for metric in efficiency_metrics}
+    dataset = Dataset(frame)
+    # indexing the dataset did not consolidate the columns into private copies
+    # (see keep_blocks), its partitions are views on the mapped file
+    for partition in dataset.state.partitions.values():
+        for metric in efficiency_metrics:
+            assert np.shares_memory(partition[metric].to_numpy(), mapped[metric])
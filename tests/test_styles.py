@@ -0,0 +1,46 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from styles import buckets, data_bars, heatmap_row_styles, range_rules
+
+RULE = re.compile(r"\{value\} >= (\S+) && \{value\} (<=?) (\S+)")
+
+
+def matching(rules, value):
+    """buckets of the rules whose filter_query matches the value"""
+    hits = []
+    for bucket, query in rules:
+        low, op, high = RULE.fullmatch(query).groups()
+        if value >= float(low) and (
+            value <= float(high) if op == "<=" else value < float(high)
+        ):
+            hits.append(bucket)
+    return hits
+
+
+def test_every_value_matches_the_rule_of_its_bucket():
+    rng = np.random.default_rng(0)
+    values = rng.gamma(4, 20, 5000)
+    values[rng.random(len(values)) < 0.05] = np.nan
+    values = np.r_[values, np.inf, -np.inf]
+    for kwargs in [{}, {"log_scale": True}, {"vmin": 40, "vmax": 90}]:
+        rules = range_rules(values, "value", 32, **kwargs)
+        bucket_of = buckets(values, 32, **kwargs)
+        for value, bucket in zip(values, bucket_of):
+            if np.isfinite(value):
+                assert matching(rules, value) == [bucket]
+            else:
+                assert bucket == -1
+                assert matching(rules, value) == []
+
+
+def test_missing_values_get_no_style():
+    df = pd.DataFrame({"value": [1.0, np.nan, 3.0], "empty": [np.nan] * 3})
+    assert len(data_bars(df, "value")) == 2
+    assert "nan" not in str(data_bars(df, "value"))
+    assert data_bars(df, "empty") == []
+    styles = heatmap_row_styles(df, "value")
+    assert [style["if"]["row_index"] for style in styles] == [0, 2]
+    assert heatmap_row_styles(df, "empty") == []
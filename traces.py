@@ -0,0 +1,156 @@
+"""ingest the power traces sampled by RAPL during the runs
+
+    python traces.py TRACES_DIR STORE_DIR [--workers 8]
+    python app.py --traces STORE_DIR
+
+every TRACES_DIR/<scenario>/<name>/<level>.csv holds the samples of one run:
+the time in seconds since its start and the power in watts of the cpu and
+dram domains (columns time, cpu, dram). the samples of every run are appended
+to one float32 file per channel of STORE_DIR, read back memory mapped, and an
+index maps each run to its range of samples. traces already indexed are
+skipped
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ingest import find_runs
+from storage import atomic_write
+
+CHANNELS = ["time", "cpu", "dram"]
+INDEX = "index.json"
+DTYPE = np.dtype("<f4")
+# traces parsed before being appended, bounds the memory of the ingestion
+BATCH = 64
+
+
+def parse_trace(path):
+    """float32 samples of every channel of a trace file, sorted by time"""
+    data = pd.read_csv(path)
+    data = data.reindex(columns=CHANNELS).sort_values("time", kind="stable")
+    return {channel: data[channel].to_numpy(DTYPE) for channel in CHANNELS}
+
+
+def trace_key(run):
+    """(scenario, name, level) of a trace file from its path in TRACES_DIR"""
+    scenario, name, level = os.path.splitext(run)[0].split(os.sep)[-3:]
+    return scenario, name, int(level)
+
+
+class TraceStore:
+    """power traces of the runs, the samples of a channel are contiguous in
+    one float32 file and memory mapped, so reading a trace costs no copy"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.stamp = None
+        self.index = {"runs": {}, "samples": 0}
+        self.runs = {}
+        self.arrays = {}
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def refresh(self):
+        """read the index again when traces were ingested since"""
+        try:
+            stamp = os.stat(self.path(INDEX)).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if stamp == self.stamp:
+            return
+        with open(self.path(INDEX)) as f:
+            index = json.load(f)
+        runs = {}
+        for run in index["runs"].values():
+            key = (run["scenario"], run["name"], run["level"])
+            runs.setdefault(key, []).append((run["start"], run["stop"]))
+        arrays = {
+            channel: np.memmap(
+                self.path(f"{channel}.f32"),
+                dtype=DTYPE,
+                mode="r",
+                shape=(index["samples"],),
+            )
+            for channel in CHANNELS
+            if index["samples"]
+        }
+        self.index, self.runs, self.arrays, self.stamp = index, runs, arrays, stamp
+
+    def trace(self, scenario, name, level):
+        """channel -> samples of the last run of the framework at that level,
+        None without trace"""
+        self.refresh()
+        ranges = self.runs.get((scenario, name, level))
+        if not ranges:
+            return None
+        start, stop = ranges[-1]
+        return {channel: self.arrays[channel][start:stop] for channel in CHANNELS}
+
+    def levels(self, scenario, names):
+        """levels with a trace of one of the frameworks"""
+        self.refresh()
+        return sorted(
+            {level for s, name, level in self.runs if s == scenario and name in names}
+        )
+
+    def append(self, traces):
+        """append (run, stat, samples) to the channel files then index them,
+        samples written after the last complete index are overwritten"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.refresh()
+        index = self.index
+        for channel in CHANNELS:
+            with open(self.path(f"{channel}.f32"), "ab") as f:
+                f.truncate(index["samples"] * DTYPE.itemsize)
+                for _, _, samples in traces:
+                    samples[channel].tofile(f)
+        for run, stat, samples in traces:
+            scenario, name, level = trace_key(run)
+            start = index["samples"]
+            index["samples"] += len(samples["time"])
+            index["runs"][run] = dict(
+                stat=stat,
+                scenario=scenario,
+                name=name,
+                level=level,
+                start=start,
+                stop=index["samples"],
+            )
+        with atomic_write(self.path(INDEX)) as tmp:
+            with open(tmp, "w") as f:
+                json.dump(index, f)
+        self.stamp = None
+
+
+def ingest_traces(traces_dir, store, workers=None):
+    """append the traces of traces_dir missing from the store, return them"""
+    traces = TraceStore(store)
+    traces.refresh()
+    found = find_runs(traces_dir)
+    new = sorted(run for run in found if run not in traces.index["runs"])
+    if not new:
+        return []
+    with ProcessPoolExecutor(workers) as pool:
+        for i in range(0, len(new), BATCH):
+            batch = new[i : i + BATCH]
+            paths = [os.path.join(traces_dir, run) for run in batch]
+            samples = pool.map(parse_trace, paths)
+            traces.append([(run, found[run], s) for run, s in zip(batch, samples)])
+    return new
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("traces", help="directory of the trace files")
+    parser.add_argument("store", help="directory of the store, created if needed")
+    parser.add_argument("--workers", type=int, help="parsing processes")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    new = ingest_traces(args.traces, args.store, args.workers)
+    print(f"{len(new)} new traces ingested in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,103 @@
+import io
+import os
+import threading
+import time
+import traceback
+
+import pandas as pd
+
+from storage import read_manifest, read_parts
+
+# bytes checked before the offset already read, when they change the csv was
+# rewritten instead of appended to
+TAIL = 256
+
+
+class SourceRewritten(Exception):
+    """the source changed by other means than new rows, it is read again"""
+
+
+class SourceWatcher:
+    """rows added to the data source since the previous poll
+
+    a csv is read from the offset where the previous poll stopped, a store
+    built by ingest.py from the parts its manifest listed since"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.reset()
+
+    def reset(self):
+        """forget what was read, the next rows are the ones added from now"""
+        if os.path.isdir(self.filename):
+            self.parts = read_manifest(self.filename)["parts"]
+        else:
+            self.header = pd.read_csv(self.filename, nrows=0).columns.tolist()
+            self.offset = os.path.getsize(self.filename)
+            self.tail = self.read(max(self.offset - TAIL, 0), self.offset)
+
+    @property
+    def revision(self):
+        """position in the source of the rows read so far"""
+        return len(self.parts) if os.path.isdir(self.filename) else self.offset
+
+    def read(self, start, stop):
+        with open(self.filename, "rb") as f:
+            f.seek(start)
+            return f.read(stop - start)
+
+    def poll(self):
+        """rows added since the previous poll, None when there are none"""
+        if os.path.isdir(self.filename):
+            return self.poll_store()
+        return self.poll_csv()
+
+    def poll_store(self):
+        parts = read_manifest(self.filename)["parts"]
+        if parts[: len(self.parts)] != self.parts:
+            raise SourceRewritten(self.filename)
+        if len(parts) == len(self.parts):
+            return None
+        rows = read_parts(self.filename, parts[len(self.parts) :])
+        self.parts = parts
+        return rows
+
+    def poll_csv(self):
+        size = os.path.getsize(self.filename)
+        start = self.offset - len(self.tail)
+        if size < self.offset or self.read(start, self.offset) != self.tail:
+            raise SourceRewritten(self.filename)
+        chunk = self.read(self.offset, size)
+        # a row still being written is read by the next poll
+        chunk = chunk[: chunk.rfind(b"\n") + 1]
+        if not chunk:
+            return None
+        self.offset += len(chunk)
+        self.tail = (self.tail + chunk)[-TAIL:]
+        if not chunk.strip():
+            return None
+        return pd.read_csv(io.BytesIO(chunk), header=None, names=self.header)
+
+
+def watch(watcher, interval, add_rows, reload):
+    """poll the watcher every interval seconds in a daemon thread, pass the new
+    rows and the revision of the source to add_rows, call reload when the
+    source was rewritten"""
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                rows = watcher.poll()
+                if rows is not None:
+                    add_rows(rows, watcher.revision)
+            except SourceRewritten:
+                watcher.reset()
+                reload()
+            except Exception:
+                # a malformed run must not stop the watcher
+                traceback.print_exc()
+
+    thread = threading.Thread(target=loop, name="greenboard-watcher", daemon=True)
+    thread.start()
+    return thread